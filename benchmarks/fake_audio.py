@@ -0,0 +1,103 @@
+"""PyAudio-compatible synthetic input so AudioRecorder can run without a microphone."""
+
+import threading
+import time
+import wave
+from typing import Optional
+import numpy as np
+
+
+def synthetic_speech(seconds: float, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """Speech-like int16 signal: voiced bursts separated by short noisy pauses."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    signal = rng.normal(0, 30, total)
+    position = 0
+    while position < total:
+        burst = int(rng.uniform(1.5, 4.0) * sample_rate)
+        t = np.arange(min(burst, total - position)) / sample_rate
+        pitch = rng.uniform(110, 220)
+        envelope = np.sin(np.pi * t / max(t[-1], 1e-3)) if len(t) else t
+        voiced = 5000 * envelope * (np.sin(2 * np.pi * pitch * t) + 0.4 * np.sin(2 * np.pi * 2 * pitch * t))
+        signal[position:position + len(t)] += voiced
+        position += len(t) + int(rng.uniform(0.3, 1.0) * sample_rate)
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def load_wav(path: str) -> (np.ndarray, int):
+    """Read a 16-bit mono WAV file into an int16 array and its sample rate."""
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError("Only 16-bit WAV files are supported")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        if wf.getnchannels() > 1:
+            samples = samples.reshape(-1, wf.getnchannels()).mean(axis=1).astype(np.int16)
+        return samples, wf.getframerate()
+
+
+class FakeStream:
+    """Feeds samples to a PyAudio stream callback from a background thread."""
+
+    def __init__(self, samples: np.ndarray, frames_per_buffer: int, callback, rate: int, speed: float):
+        self._samples = samples
+        self._frames = frames_per_buffer
+        self._callback = callback
+        self._interval = frames_per_buffer / rate / speed
+        self._active = True
+        self.exhausted = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_at = time.perf_counter()
+        for start in range(0, len(self._samples), self._frames):
+            if not self._active:
+                return
+            chunk = self._samples[start:start + self._frames].tobytes()
+            self._callback(chunk, len(chunk) // 2, {}, 0)
+            next_at += self._interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.exhausted.set()
+
+    def is_active(self):
+        return self._active
+
+    def stop_stream(self):
+        self._active = False
+
+    def close(self):
+        self._active = False
+
+
+class FakePyAudio:
+    """Stand-in for pyaudio.PyAudio that plays back a fixed signal as microphone input.
+
+    `speed` > 1 delivers audio faster than real time so long recordings can
+    be benchmarked quickly.
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int = 16000, speed: float = 1.0):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.stream: Optional[FakeStream] = None
+
+    def get_default_input_device_info(self):
+        return {'index': 0, 'defaultSampleRate': float(self.sample_rate)}
+
+    def is_format_supported(self, rate, input_device=None, input_channels=None, input_format=None):
+        if rate != self.sample_rate:
+            raise ValueError("Invalid sample rate")
+        return True
+
+    def get_sample_size(self, format_type):
+        return 2
+
+    def open(self, format=None, channels=1, rate=None, input=True, frames_per_buffer=1024, stream_callback=None):
+        self.stream = FakeStream(self.samples, frames_per_buffer, stream_callback, rate, self.speed)
+        return self.stream
+
+    def terminate(self):
+        pass
@@ -0,0 +1,181 @@
+"""Offline end-to-end benchmark of the dictation pipeline.
+
+Drives AudioRecorder from a synthetic (or WAV file) input, sends requests to a
+local stub provider and stubs out text insertion, then reports stop-to-text
+latency, CPU time and peak Python memory per recording length and mode.
+
+The stub provider runs in a child process, so CPU time and memory only cover
+the app's side. Peak memory comes from a separate run with tracemalloc on,
+which would otherwise slow down the timed runs.
+
+    python -m benchmarks.run --lengths 5 30 120 --speed 20 --latency 0.3
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_audio import FakePyAudio, load_wav, synthetic_speech
+from benchmarks.stub_provider import StubConfig, StubProcess
+
+SAMPLE_RATE = 16000
+MODES = ("batch", "streaming", "prompt")
+
+
+class StubInserter:
+    """Records insertions instead of pasting them."""
+
+    def __init__(self):
+        self.inserted = []
+        self.first_insert_at = None
+
+    def _insert(self, text):
+        if self.first_insert_at is None:
+            self.first_insert_at = time.perf_counter()
+        self.inserted.append(text)
+
+    def insert_text_with_shortcut(self, text):
+        self._insert(text)
+
+    def insert_stream(self, chunks):
+        for chunk in chunks:
+            self._insert(chunk)
+
+    def get_selected_text(self):
+        return ""
+
+
+def configure_environment(stub: StubProcess, providers):
+    """Isolate config/metrics in a temporary home and point the SDKs at the stub."""
+    home = tempfile.mkdtemp(prefix="whishpy-bench-")
+    os.environ["HOME"] = home
+    os.environ["GROQ_BASE_URL"] = stub.url
+    os.environ["OPENAI_BASE_URL"] = f"{stub.url}/v1"
+    os.makedirs(os.path.join(home, ".whishpy"), exist_ok=True)
+    with open(os.path.join(home, ".whishpy", "config.json"), "w") as f:
+        json.dump({
+            "api_key": "stub-key",
+            "provider": providers[0],
+            "api_keys": {provider: "stub-key" for provider in providers},
+        }, f)
+    return home
+
+
+def make_samples(seconds, wav_path=None):
+    import numpy as np
+    if not wav_path:
+        return synthetic_speech(seconds, SAMPLE_RATE)
+    samples, rate = load_wav(wav_path)
+    if rate != SAMPLE_RATE:
+        from src.audio_codec import resample_pcm
+        samples = resample_pcm(samples.tobytes(), rate, SAMPLE_RATE)[:, 0]
+    needed = int(seconds * SAMPLE_RATE)
+    return np.resize(samples, needed)
+
+
+def run_once(service, mode, seconds, speed, wav_path=None, trace_memory=False):
+    """Record `seconds` of input and measure the time from stop until text is inserted.
+
+    With `trace_memory`, the result's peak_mb is the peak traced Python memory of the run.
+    """
+    from src.audio_recorder import AudioRecorder
+    from src.streaming_transcriber import StreamingTranscriber
+
+    inserter = StubInserter()
+    fake = FakePyAudio(make_samples(seconds, wav_path), SAMPLE_RATE, speed)
+    session = StreamingTranscriber(service, SAMPLE_RATE) if mode == "streaming" else None
+    recorder = AudioRecorder(sample_rate=SAMPLE_RATE, audio_interface=fake,
+                             frame_listener=session.feed if session else None)
+
+    if trace_memory:
+        tracemalloc.start()
+    cpu_started = time.process_time()
+    if not recorder.start_recording():
+        raise RuntimeError("Recorder failed to start")
+    fake.stream.exhausted.wait()
+
+    stopped_at = time.perf_counter()
+    audio = recorder.stop_recording()
+    if session:
+        text = session.finish()
+    else:
+        text = service.transcribe_audio(audio)
+    if mode == "prompt":
+        inserter.insert_stream(service.stream_response_with_context(text, inserter.get_selected_text()))
+    else:
+        inserter.insert_text_with_shortcut(text)
+    finished_at = time.perf_counter()
+    cpu_s = time.process_time() - cpu_started
+
+    result = {
+        "mode": mode,
+        "seconds": seconds,
+        "stop_to_text_ms": round((finished_at - stopped_at) * 1000, 1),
+        "stop_to_first_text_ms": round((inserter.first_insert_at - stopped_at) * 1000, 1),
+        "cpu_s": round(cpu_s, 3),
+    }
+    if trace_memory:
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline whishpy pipeline benchmark")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[5, 30, 120],
+                        help="recording lengths in seconds")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per length and mode")
+    parser.add_argument("--speed", type=float, default=20.0, help="input playback speed (1 = real time)")
+    parser.add_argument("--wav", help="use a 16-bit WAV file instead of synthetic speech")
+    parser.add_argument("--providers", nargs="+", choices=("groq", "openai"), default=["groq"])
+    parser.add_argument("--latency", type=float, default=0.3, help="stub base latency in seconds")
+    parser.add_argument("--latency-per-mb", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=0, help="stub requests-per-minute limit (0 = none)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per run")
+    args = parser.parse_args(argv)
+
+    stub = StubProcess(StubConfig(latency=args.latency, latency_per_mb=args.latency_per_mb,
+                                   error_rate=args.error_rate, requests_per_minute=args.rpm)).start()
+    configure_environment(stub, args.providers)
+
+    # Imported after the environment is configured: settings and metrics read HOME at import
+    from src.transcription_service import TranscriptionService
+    from src.metrics import metrics
+
+    service = TranscriptionService(interactive=False)
+    service.warm_up()
+    results = []
+    for seconds in args.lengths:
+        for mode in args.modes:
+            # Timed runs first, then one traced run for the peak memory of this length and mode
+            runs = [run_once(service, mode, seconds, args.speed, args.wav) for _ in range(args.repeat)]
+            peak_mb = run_once(service, mode, seconds, args.speed, args.wav, trace_memory=True)["peak_mb"]
+            for result in runs:
+                result["peak_mb"] = peak_mb
+                results.append(result)
+                if args.json:
+                    print(json.dumps(result))
+    counts = stub.counts
+    stub.stop()
+
+    if not args.json:
+        print(f"{'mode':<10} {'length s':>8} {'stop->text ms':>14} {'first text ms':>14} {'cpu s':>7} {'peak MB':>8}")
+        for seconds in args.lengths:
+            for mode in args.modes:
+                runs = [r for r in results if r["mode"] == mode and r["seconds"] == seconds]
+                median = sorted(runs, key=lambda r: r["stop_to_text_ms"])[len(runs) // 2]
+                print(f"{mode:<10} {seconds:>8g} {median['stop_to_text_ms']:>14} "
+                      f"{median['stop_to_first_text_ms']:>14} {median['cpu_s']:>7} {median['peak_mb']:>8}")
+        print(f"\nStub requests: {counts}")
+        print(metrics.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
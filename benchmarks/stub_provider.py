@@ -0,0 +1,248 @@
+"""Local HTTP server emulating the Groq/OpenAI transcription and chat-completions APIs.
+
+Point the SDKs at it with GROQ_BASE_URL=http://127.0.0.1:PORT and
+OPENAI_BASE_URL=http://127.0.0.1:PORT/v1. Latency, error rate and a
+requests-per-minute limit are configurable so retries, routing and rate
+limiting can be exercised offline.
+
+StubProcess runs the server in a child process, so a benchmark's CPU time
+and memory only cover the client side:
+
+    python -m benchmarks.stub_provider --latency 0.3
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, latency: float = 0.2, latency_per_mb: float = 0.5, jitter: float = 0.05,
+                 error_rate: float = 0.0, requests_per_minute: int = 0, tokens_per_second: float = 200.0,
+                 response_text: str = "This is a stub transcription."):
+        self.latency = latency                      # base seconds per request
+        self.latency_per_mb = latency_per_mb        # extra seconds per MB uploaded
+        self.jitter = jitter                        # +/- uniform jitter in seconds
+        self.error_rate = error_rate                # fraction of requests answered with a 500
+        self.requests_per_minute = requests_per_minute  # 0 disables rate limiting
+        self.tokens_per_second = tokens_per_second  # streamed chat speed
+        self.response_text = response_text
+
+
+class StubProvider:
+    """Threaded stub server with per-endpoint request counters."""
+
+    def __init__(self, config: StubConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.counts = {}
+        self._requests = deque()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubProvider":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def _rate_limited(self) -> float:
+        """Seconds until a request slot frees up, or 0 if this request is allowed."""
+        limit = self.config.requests_per_minute
+        if not limit:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            while self._requests and now - self._requests[0] > 60:
+                self._requests.popleft()
+            if len(self._requests) >= limit:
+                return 60 - (now - self._requests[0])
+            self._requests.append(now)
+        return 0.0
+
+    def _remaining(self) -> int:
+        with self._lock:
+            return max(0, self.config.requests_per_minute - len(self._requests))
+
+    def _handler_class(self):
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _rate_limit_headers(self):
+                if not provider.config.requests_per_minute:
+                    return {}
+                return {
+                    "x-ratelimit-limit-requests": str(provider.config.requests_per_minute),
+                    "x-ratelimit-remaining-requests": str(provider._remaining()),
+                }
+
+            def _simulate(self, size: int) -> bool:
+                """Apply rate limits, latency and injected errors; False if an error was sent."""
+                wait = provider._rate_limited()
+                if wait:
+                    self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                                    {"retry-after": f"{wait:.2f}", **self._rate_limit_headers()})
+                    return False
+                cfg = provider.config
+                time.sleep(max(0.0, cfg.latency + cfg.latency_per_mb * size / 1e6
+                               + random.uniform(-cfg.jitter, cfg.jitter)))
+                if random.random() < cfg.error_rate:
+                    self._send_json(500, {"error": {"message": "Injected failure", "type": "server_error"}})
+                    return False
+                return True
+
+            def do_GET(self):
+                if self.path == "/_counts":
+                    with provider._lock:
+                        self._send_json(200, dict(provider.counts))
+                elif self.path.rstrip("/").endswith("/models"):
+                    provider._count("models")
+                    self._send_json(200, {"object": "list", "data": []})
+                else:
+                    self._send_json(404, {"error": {"message": "Not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                if self.path.endswith("/audio/transcriptions"):
+                    provider._count("transcriptions")
+                    if self._simulate(len(body)):
+                        self._send_json(200, {"text": provider.config.response_text}, self._rate_limit_headers())
+                elif self.path.endswith("/chat/completions"):
+                    provider._count("chat")
+                    request = json.loads(body or b"{}")
+                    if self._simulate(0):
+                        if request.get("stream"):
+                            self._stream_chat(request)
+                        else:
+                            self._send_json(200, self._completion(request), self._rate_limit_headers())
+                else:
+                    self._send_json(404, {"error": {"message": "Not found"}})
+
+            def _completion(self, request):
+                return {
+                    "id": "stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": provider.config.response_text}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }
+
+            def _stream_chat(self, request):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                words = provider.config.response_text.split(" ")
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [{"index": 0, "finish_reason": None,
+                                     "delta": {"content": word + (" " if i < len(words) - 1 else "")}}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(1 / provider.config.tokens_per_second)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+class StubProcess:
+    """A StubProvider serving from a child process, with the same url, counts and stop()."""
+
+    def __init__(self, config: StubConfig = None):
+        self.config = config or StubConfig()
+        self._process = None
+        self.url = None
+
+    def start(self) -> "StubProcess":
+        cfg = self.config
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.stub_provider", "--latency", str(cfg.latency),
+             "--latency-per-mb", str(cfg.latency_per_mb), "--jitter", str(cfg.jitter),
+             "--error-rate", str(cfg.error_rate), "--rpm", str(cfg.requests_per_minute),
+             "--tokens-per-second", str(cfg.tokens_per_second), "--response-text", cfg.response_text],
+            stdout=subprocess.PIPE, text=True)
+        line = self._process.stdout.readline().strip()
+        if not line:
+            self._process.kill()
+            raise RuntimeError("Stub provider process failed to start")
+        self.url = line
+        return self
+
+    @property
+    def counts(self) -> dict:
+        with urllib.request.urlopen(f"{self.url}/_counts", timeout=5) as response:
+            return json.load(response)
+
+    def stop(self):
+        self._process.terminate()
+        self._process.wait(timeout=5)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the stub provider until interrupted")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--latency-per-mb", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--response-text", default="This is a stub transcription.")
+    args = parser.parse_args(argv)
+
+    stub = StubProvider(StubConfig(latency=args.latency, latency_per_mb=args.latency_per_mb, jitter=args.jitter,
+                                   error_rate=args.error_rate, requests_per_minute=args.rpm,
+                                   tokens_per_second=args.tokens_per_second, response_text=args.response_text),
+                        port=args.port)
+    # The parent reads the URL from the first line
+    print(stub.url, flush=True)
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,7 +22,7 @@ OPTIONS = {
         'NSHighResolutionCapable': True,
     },
     'resources': ['whishpy.png'],
-    'excludes': ['tkinter', 'matplotlib', 'numpy', 'pandas'],
+    'excludes': ['tkinter', 'matplotlib', 'pandas'],
 }
 
 setup(
@@ -0,0 +1,676 @@
+"""The menu bar app: recording controls, settings and history menus."""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import rumps
+from src.startup_profile import startup_profile
+from src.audio_recorder import AudioRecorder
+from src.transcription_service import TranscriptionService
+from src.streaming_transcriber import StreamingTranscriber
+from src.text_inserter import TextInserter
+from src.pipeline import PipelineExecutor
+from src.history import HistoryStore
+from src.circular_logger import logger, setup_logging
+from src.metrics import metrics
+from src.rate_limiter import rate_limiter
+
+startup_profile.mark("imports")
+
+# Entries listed in the History menu
+HISTORY_MENU_SIZE = 10
+
+class VoiceToTextApp(rumps.App):
+    def __init__(self, profile_startup=False):
+        super(VoiceToTextApp, self).__init__("🎙️", quit_button=None)
+        setup_logging()
+        logger.info("Application initialized")
+        
+        # Load max recording time from config
+        from src.config import (load_max_recording_time, load_streaming_enabled, load_sample_rate, load_vad_enabled,
+                                load_stream_responses, load_push_to_talk, load_history_audio,
+                                load_history_context)
+        self.max_recording_time = load_max_recording_time()
+        self.streaming_enabled = load_streaming_enabled()
+        self.stream_responses = load_stream_responses()
+        self.push_to_talk = load_push_to_talk()
+        self.hotkey = None
+        self._stream_session = None
+        # A recording stopped by the max recording time timer, waiting for the main thread to queue it
+        self._max_time_recording = None
+        self._max_time_lock = threading.Lock()
+        # Work posted by listener and worker threads; AppKit alerts, menus and the title belong to the main thread
+        self._main_thread_calls = queue.SimpleQueue()
+        
+        # Initialize components
+        self.audio_recorder = AudioRecorder(
+            max_recording_time=self.max_recording_time,
+            stop_callback=self._on_max_recording_time,
+            sample_rate=load_sample_rate()
+        )
+        self.transcription_service = TranscriptionService()
+        self.text_inserter = TextInserter()
+        self.pipeline = PipelineExecutor(workers=2, max_pending=4)
+        # Prompt mode grabs the selected text as recording starts, while focus is still on it
+        self._context_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context")
+        self._context = None
+        # Past transcripts and responses, saved off the hot path and re-insertable from the menu
+        self.history = HistoryStore()
+        self.history_audio = load_history_audio()
+        # The selected text (or the whole clipboard) may hold passwords, so it is only kept when asked for
+        self.history_context = load_history_context()
+        self._history_query = None
+        self._history_version = None
+        
+        # Setup menu
+        self.click_to_record_item = rumps.MenuItem("Start transcribing", callback=self.toggle_recording)
+        self.prompt_item = rumps.MenuItem("Ask AI to write", callback=self.prompt_ai_with_selected_text)
+        self.streaming_item = rumps.MenuItem("Streaming Transcription", callback=self.toggle_streaming)
+        self.streaming_item.state = self.streaming_enabled
+        self.vad_item = rumps.MenuItem("Trim Silence", callback=self.toggle_vad)
+        self.vad_item.state = load_vad_enabled()
+        self.hedging_item = rumps.MenuItem("Hedge Slow Requests", callback=self.toggle_hedging)
+        self.hedging_item.state = self.transcription_service.router.hedge
+        self.stream_responses_item = rumps.MenuItem("Stream AI Responses", callback=self.toggle_stream_responses)
+        self.stream_responses_item.state = self.stream_responses
+        self.local_item = rumps.MenuItem("Local Transcription", callback=self.toggle_local_transcription)
+        self.local_item.state = self.transcription_service.local_enabled
+        self.push_to_talk_item = rumps.MenuItem("Push-to-Talk", callback=self.toggle_push_to_talk)
+        self.push_to_talk_item.state = self.push_to_talk
+        self.history_item = rumps.MenuItem("History")
+        self.menu = [
+            self.click_to_record_item,
+            None,  # Separator
+            self.prompt_item,
+            rumps.MenuItem("Cancel Processing", callback=self.cancel_processing),
+            self.history_item,
+            None,  # Separator
+            {
+                "Settings": [
+                    rumps.MenuItem("Set Max Recording Time...", callback=self.set_max_recording_time),
+                    rumps.MenuItem("Set API Key", callback=self.set_api_key),
+                    self.streaming_item,
+                    self.vad_item,
+                    self.hedging_item,
+                    self.stream_responses_item,
+                    self.local_item,
+                    self.push_to_talk_item,
+                ]
+            },
+            rumps.MenuItem("Latency Stats", callback=self.show_latency_stats),
+            rumps.MenuItem("Quit", callback=self.quit_app)
+        ]
+        self.is_prompt_mode = False
+
+        # Keep components and menu in sync with settings, including edits made to config.json.
+        # Settings notify on whichever thread saved or reloaded them, so the handlers run on the main thread.
+        from src.config import subscribe
+        for key, handler in (('max_recording_time', self._on_max_recording_time_changed),
+                             ('streaming_enabled', self._on_streaming_changed),
+                             ('stream_responses', self._on_stream_responses_changed),
+                             ('vad_enabled', self._on_vad_changed),
+                             ('hedging_enabled', self._on_hedging_changed),
+                             ('local_transcription', self._on_local_transcription_changed),
+                             ('push_to_talk', self._on_push_to_talk_changed),
+                             ('history_audio', lambda enabled: setattr(self, 'history_audio', bool(enabled))),
+                             ('history_context', lambda enabled: setattr(self, 'history_context', bool(enabled)))):
+            subscribe(key, lambda value, handler=handler: self._call_on_main_thread(handler, value))
+
+        # Device enumeration and SDK imports run after the icon is shown, off the UI thread
+        self.profile_startup = profile_startup
+        self._warm_up_timer = rumps.Timer(self._start_warm_up, 0.01)
+        self._warm_up_timer.start()
+        # Menus are only rebuilt on the main thread, once the history writer has committed something new
+        self._history_timer = rumps.Timer(self._refresh_history_menu, 1)
+        self._history_timer.start()
+        self._main_thread_timer = rumps.Timer(self._run_main_thread_calls, 0.05)
+        self._main_thread_timer.start()
+        startup_profile.mark("app_init")
+
+    def _call_on_main_thread(self, function, *args):
+        """Run `function(*args)` on the main thread at its next timer tick."""
+        self._main_thread_calls.put((function, args))
+
+    def _run_main_thread_calls(self, _):
+        while True:
+            try:
+                function, args = self._main_thread_calls.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                function(*args)
+            except Exception as e:
+                logger.error(f"Error in {getattr(function, '__name__', function)}: {str(e)}")
+
+    def _start_warm_up(self, timer):
+        """Runs once the event loop is up and the icon is visible."""
+        timer.stop()
+        startup_profile.mark("icon_shown")
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    def _warm_up(self):
+        """Load heavy dependencies in the background so the first recording starts instantly."""
+        for component in (self.audio_recorder, self.text_inserter, self.transcription_service):
+            try:
+                component.warm_up()
+            except Exception as e:
+                logger.error(f"Warm-up of {type(component).__name__} failed: {str(e)}")
+        if self.push_to_talk:
+            self._call_on_main_thread(self._enable_push_to_talk)
+        startup_profile.mark("ready")
+        metrics.record("launch_to_ready", startup_profile.elapsed())
+        report = startup_profile.report()
+        logger.info(f"Startup profile:\n{report}")
+        if self.profile_startup:
+            print(report)
+            # Runs on the warm-up thread; AppKit must be told to quit from the main thread
+            self._call_on_main_thread(rumps.quit_application)
+    
+    def set_api_key(self, _):
+        """Handle settings window for API key management."""
+        logger.info("Opening API key settings")
+        # The transcription service now handles both API key and provider
+        self.transcription_service._prompt_for_api_key()
+
+    def set_max_recording_time(self, _):
+        """Set maximum recording time in minutes."""
+        from src.config import save_max_recording_time
+        
+        window = rumps.Window(
+            message="Enter max recording time in minutes (0 to disable):",
+            default_text=str(self.max_recording_time // 60 if self.max_recording_time else ""),
+            title="Set Max Recording Time",
+            ok="Save",
+            cancel="Cancel",
+            dimensions=(200, 30)
+        )
+        
+        response = window.run()
+        if response.clicked:
+            try:
+                minutes = int(response.text)
+                if minutes < 0:
+                    raise ValueError("Time must be positive")
+                
+                # Subscribers update the AudioRecorder with the new max time
+                if minutes == 0:
+                    save_max_recording_time(None)
+                    rumps.notification("Max Recording Time", "Disabled", "Max recording time disabled")
+                else:
+                    save_max_recording_time(minutes * 60)
+                    rumps.notification(
+                        "Max Recording Time", 
+                        "Set", 
+                        f"Max recording time set to {minutes} minutes"
+                    )
+                
+            except ValueError as e:
+                rumps.alert("Invalid Input", "Please enter a valid number of minutes")
+
+    def _on_max_recording_time_changed(self, max_time):
+        self.max_recording_time = max_time
+        self.audio_recorder.max_recording_time = max_time
+    
+    def toggle_streaming(self, sender):
+        """Toggle transcribing segments in the background while recording."""
+        from src.config import save_streaming_enabled
+        save_streaming_enabled(not self.streaming_enabled)
+
+    def _on_streaming_changed(self, enabled):
+        self.streaming_enabled = bool(enabled)
+        self.streaming_item.state = self.streaming_enabled
+        logger.info(f"Streaming transcription {'enabled' if self.streaming_enabled else 'disabled'}")
+
+    def toggle_vad(self, sender):
+        """Toggle trimming silence and skipping speechless recordings before upload."""
+        from src.config import save_vad_enabled
+        save_vad_enabled(not self.transcription_service.vad_enabled)
+
+    def _on_vad_changed(self, enabled):
+        self.vad_item.state = enabled is not False
+        logger.info(f"Silence trimming {'enabled' if enabled is not False else 'disabled'}")
+
+    def toggle_hedging(self, sender):
+        """Toggle duplicating slow requests to the second-fastest provider."""
+        from src.config import save_hedging_enabled
+        save_hedging_enabled(not self.transcription_service.router.hedge)
+
+    def _on_hedging_changed(self, enabled):
+        self.hedging_item.state = bool(enabled)
+        logger.info(f"Request hedging {'enabled' if enabled else 'disabled'}")
+
+    def toggle_stream_responses(self, sender):
+        """Toggle inserting AI responses sentence by sentence as they arrive."""
+        from src.config import save_stream_responses
+        save_stream_responses(not self.stream_responses)
+
+    def _on_stream_responses_changed(self, enabled):
+        self.stream_responses = enabled is not False
+        self.stream_responses_item.state = self.stream_responses
+        logger.info(f"Streaming AI responses {'enabled' if self.stream_responses else 'disabled'}")
+
+    def toggle_local_transcription(self, sender):
+        """Toggle transcribing short dictations with the on-device Whisper model."""
+        from src.config import save_local_transcription
+        local = self.transcription_service.local_whisper
+        if not self.transcription_service.local_enabled and not local.installed():
+            rumps.alert("Local Transcription", "Install faster-whisper to transcribe on this Mac:\n\n"
+                                               "pip install faster-whisper")
+            return
+        save_local_transcription(not self.transcription_service.local_enabled)
+
+    def _on_local_transcription_changed(self, enabled):
+        self.local_item.state = bool(enabled)
+        logger.info(f"Local transcription {'enabled' if enabled else 'disabled'}")
+
+    def toggle_push_to_talk(self, sender):
+        """Toggle keeping the microphone armed for the push-to-talk hotkey."""
+        from src.config import save_push_to_talk
+        save_push_to_talk(not self.push_to_talk)
+
+    def _on_push_to_talk_changed(self, enabled):
+        self.push_to_talk = bool(enabled)
+        self.push_to_talk_item.state = self.push_to_talk
+        if self.push_to_talk:
+            self._enable_push_to_talk()
+        else:
+            self._disable_push_to_talk()
+
+    def _enable_push_to_talk(self):
+        """Arm the input stream and listen for the hotkey."""
+        from src.config import load_push_to_talk_hotkey
+        from src.hotkey import PushToTalkHotkey
+        if self.hotkey is not None:
+            return
+        if not self.audio_recorder.arm():
+            logger.error("Push-to-talk unavailable: could not open the input stream")
+            return
+        hotkey = PushToTalkHotkey(load_push_to_talk_hotkey(), self._on_push_to_talk_press,
+                                  self._on_push_to_talk_release)
+        try:
+            hotkey.start()
+        except Exception as e:
+            logger.error(f"Push-to-talk unavailable: {str(e)}")
+            self.audio_recorder.disarm()
+            return
+        self.hotkey = hotkey
+
+    def _disable_push_to_talk(self):
+        if self.hotkey is not None:
+            self.hotkey.stop()
+            self.hotkey = None
+        self.audio_recorder.disarm()
+        logger.info("Push-to-talk disabled")
+
+    def _on_push_to_talk_press(self):
+        # Runs on the hotkey listener thread, which must return at once and never touch AppKit.
+        # The armed stream's pre-roll covers the wait for the main thread to start the recording.
+        self._call_on_main_thread(self._push_to_talk_start)
+
+    def _on_push_to_talk_release(self):
+        self._call_on_main_thread(self._push_to_talk_stop)
+
+    def _push_to_talk_start(self):
+        self._submit_max_time_recording()
+        if not self.audio_recorder.is_recording and not self.is_prompt_mode:
+            self.click_to_record_item.title = "Stop transcribing"
+            self._start_recording()
+
+    def _push_to_talk_stop(self):
+        if self.audio_recorder.is_recording and not self.is_prompt_mode:
+            self._stop_recording()
+            self.click_to_record_item.title = "Start transcribing"
+
+    def show_latency_stats(self, _):
+        """Show rolling per-stage latency percentiles."""
+        rumps.alert("Latency Stats", f"{metrics.report()}\n\nRate limits:\n{rate_limiter.summary()}"
+                                     f"\n\nStartup:\n{startup_profile.report()}"
+                                     f"\n\nAll timings: {metrics.export_path}")
+
+    def _refresh_history_menu(self, _):
+        """Rebuild the History submenu from recent (or searched) entries when the history changes."""
+        if self._history_version == self.history.version:
+            return
+        self._history_version = self.history.version
+        if self._history_query:
+            entries = self.history.search(self._history_query, HISTORY_MENU_SIZE)
+        else:
+            entries = self.history.recent(HISTORY_MENU_SIZE)
+        self.history_item.clear()
+        self.history_item.add(rumps.MenuItem("Search History...", callback=self.search_history))
+        if self._history_query:
+            self.history_item.add(rumps.MenuItem("Show Recent", callback=self.show_recent_history))
+        self.history_item.add(rumps.separator)
+        if not entries:
+            self.history_item.add(rumps.MenuItem("No matches" if self._history_query else "No history yet"))
+        for entry in entries:
+            # Menu titles must be unique; a repeat of the same text at the same minute can be skipped
+            title = f"{time.strftime('%a %H:%M', time.localtime(entry.created_at))}  {entry.title}"
+            if title not in self.history_item:
+                self.history_item.add(rumps.MenuItem(title, callback=lambda _, entry=entry: self._reinsert(entry)))
+
+    def search_history(self, _):
+        """Ask for search words and list the matching entries in the History menu."""
+        response = rumps.Window(
+            title="Search History",
+            message="Words from a past dictation or AI response:",
+            default_text=self._history_query or "",
+            ok="Search",
+            cancel="Cancel",
+            dimensions=(320, 24)
+        ).run()
+        if not response.clicked:
+            return
+        self._history_query = response.text.strip() or None
+        self._history_version = None
+        self._refresh_history_menu(None)
+
+    def show_recent_history(self, _):
+        self._history_query = None
+        self._history_version = None
+        self._refresh_history_menu(None)
+
+    def _reinsert(self, entry):
+        """Insert a past transcript or response again, without another API call."""
+        logger.info(f"Re-inserting history entry {entry.id}")
+        # Off the main thread, so the menu has closed and focus is back on the target app
+        threading.Thread(target=self.text_inserter.insert_text_with_shortcut, args=(entry.text,),
+                         daemon=True).start()
+
+    def quit_app(self, _):
+        """Quit the application."""
+        logger.info("Application shutdown initiated")
+        # Ensure all resources are cleaned up
+        if self.audio_recorder.is_recording:
+            self.audio_recorder.stop_recording()
+        from src.config import flush_settings
+        flush_settings()
+        self.transcription_service.local_whisper.stop()
+        if self.hotkey is not None:
+            self.hotkey.stop()
+        self.audio_recorder.disarm()
+        self.history.flush(timeout=2)
+        rumps.quit_application()
+    
+    def toggle_recording(self, _):
+        """Toggle between starting and stopping recording."""
+        self._submit_max_time_recording()
+        if self.is_prompt_mode:
+            return
+        if self.audio_recorder.is_recording:
+            self._stop_recording()
+            self.click_to_record_item.title = "Start transcribing"
+        else:
+            self.click_to_record_item.title = "Stop transcribing"
+            self._start_recording()
+    
+    def _start_recording(self):
+        """Start audio recording."""
+        if self.pipeline.full:
+            # Refuse now rather than discard a finished recording that cannot be queued
+            self.prompt_item.title = "Ask AI to write"
+            self.click_to_record_item.title = "Start transcribing"
+            self.is_prompt_mode = False
+            logger.warning("Pipeline full, not starting a recording")
+            rumps.alert("Busy", "Too many recordings are waiting to be processed. Please try again shortly.")
+            return
+        logger.info("Starting recording")
+        if self.is_prompt_mode:
+            self._context = self._context_executor.submit(self.text_inserter.get_selected_text)
+        if self.streaming_enabled:
+            self._stream_session = StreamingTranscriber(
+                self.transcription_service,
+                sample_rate=self.audio_recorder.capture_rate,
+                channels=self.audio_recorder.channels
+            )
+            self.audio_recorder.frame_listener = self._stream_session.feed
+        if not self.audio_recorder.start_recording():
+            session = self._take_stream_session()
+            if session:
+                session.cancel()
+            self._context = None
+            error_msg = "Unable to start recording"
+            logger.error(error_msg)
+            rumps.alert("Recording Error", error_msg)
+            return
+        
+        self.title = "🔴"
+        # Warn now rather than after a dictation that every provider would reject
+        warning = self.transcription_service.quota_warning(self.max_recording_time or 30)
+        if warning:
+            logger.warning(f"Rate limit headroom exhausted: {warning}")
+            rumps.notification("Rate Limit", "Transcription may be delayed", warning)
+    
+    def _stop_recording(self):
+        """Stop audio recording and queue the audio for processing."""
+        logger.info("Stopping recording")
+        audio = self.audio_recorder.stop_recording()
+        
+        if not audio:
+            session = self._take_stream_session()
+            if session:
+                session.cancel()
+            self._context = None
+            self.title = "⏳" if self.pipeline.pending else "🎙️"
+            error_msg = "No audio was recorded"
+            logger.error(error_msg)
+            rumps.alert("Recording Error", error_msg)
+            return
+        
+        self._submit_recording(audio, self.is_prompt_mode)
+
+    def _on_max_recording_time(self, audio):
+        """Hand a recording stopped by the max recording time timer to the main thread.
+
+        Runs on the timer thread, so the recording is only queued once the main thread gets to it.
+        """
+        with self._max_time_lock:
+            self._max_time_recording = (audio, self.is_prompt_mode)
+        self._call_on_main_thread(self._submit_max_time_recording)
+
+    def _submit_max_time_recording(self):
+        # Also called before a new recording starts, since the stopped one owns the current stream session
+        with self._max_time_lock:
+            recording, self._max_time_recording = self._max_time_recording, None
+        if recording:
+            self._submit_recording(*recording)
+
+    def _submit_recording(self, audio, prompt_mode=False):
+        """Queue a finished recording on the pipeline executor."""
+        session = self._take_stream_session()
+        context, self._context = self._context, None
+        if prompt_mode:
+            job = self.pipeline.submit(
+                "prompt",
+                lambda job: self._process_prompt_recording(job, audio, session, context),
+                deliver=self._insert_text,
+                on_error=lambda error: self._call_on_main_thread(self._on_processing_error, error),
+                on_finish=lambda job: self._call_on_main_thread(self._on_job_finished, job)
+            )
+        else:
+            job = self.pipeline.submit(
+                "transcription",
+                lambda job: self._process_recording(job, audio, session),
+                deliver=self._insert_text,
+                on_error=lambda error: self._call_on_main_thread(self._on_processing_error, error),
+                on_finish=lambda job: self._call_on_main_thread(self._on_job_finished, job)
+            )
+
+        # The recording itself is over, so the menu is ready for the next one
+        self.prompt_item.title = "Ask AI to write"
+        self.click_to_record_item.title = "Start transcribing"
+        self.is_prompt_mode = False
+
+        if job is None:
+            if session:
+                session.cancel()
+            self.title = "🎙️"
+            rumps.alert("Busy", "Too many recordings are waiting to be processed. Please try again shortly.")
+            return
+        self.title = "⏳"
+
+    def cancel_processing(self, _):
+        """Cancel every recording that is still being processed."""
+        logger.info("Cancelling pending recordings")
+        self.pipeline.cancel_all()
+
+    def prompt_ai_with_selected_text(self, _):
+        """Handle the Prompt menu item click."""
+        self._submit_max_time_recording()
+        if self.audio_recorder.is_recording:
+            if self.is_prompt_mode: 
+                self._stop_recording()
+            else:
+                return
+        else:
+            self.is_prompt_mode = True
+            self.prompt_item.title = "Click to stop"
+            self._start_recording()
+        
+    
+    def _take_stream_session(self):
+        """Detach the streaming session of the recording that just stopped."""
+        session = self._stream_session
+        self._stream_session = None
+        self.audio_recorder.frame_listener = None
+        return session
+
+    def _transcribe(self, audio, session=None):
+        """Transcribe a recording, using its streamed segments when available, and apply the vocabulary."""
+        self.transcription_service.router.forget_route()
+        text = None
+        if session:
+            try:
+                text = session.finish()
+            except Exception as e:
+                logger.warning(f"Streaming transcription failed, transcribing full recording: {str(e)}")
+            if text == "":
+                logger.warning("Streaming transcription came back empty, transcribing full recording")
+        if not text:
+            text = self.transcription_service.transcribe_audio(audio)
+        # Once over the whole text, so phrases split across streamed segments still match
+        with metrics.span("vocabulary"):
+            return self.transcription_service.vocabulary.apply(text)
+
+    def _process_prompt_recording(self, job, audio, session=None, context=None):
+        """Turn a prompt recording into an AI response. Runs on a pipeline worker.
+
+        The selected text was captured when recording started (`context`), so
+        the request fires as soon as the transcript arrives.
+        """
+        logger.info(f"Processing prompt recording: {audio}")
+
+        # Transcribe audio
+        transcription = self._transcribe(audio, session)
+        if not transcription:
+            logger.warning("Empty transcription received")
+            return None
+        if job.cancelled:
+            return None
+        routes = [self.transcription_service.router.last_route]
+
+        # Selected text, normally captured long before the transcript is ready
+        with metrics.span("context_wait"):
+            selected_text = self._selected_text(context)
+
+        # Generate response. A streamed response is only opened here; it is read
+        # and inserted on delivery so it cannot overtake an earlier recording.
+        if self.stream_responses:
+            response = self.transcription_service.stream_response_with_context(
+                transcription,
+                selected_text
+            )
+            # Closed when the job finishes, in case it is cancelled before the stream is read
+            job.details["stream"] = response
+            # The history gets the streamed text once it has all been inserted
+            parts = []
+            response = self._collect(response, parts)
+        else:
+            response = self.transcription_service.generate_response_with_context(
+                transcription,
+                selected_text
+            )
+            parts = [response]
+        routes.append(self.transcription_service.router.last_route)
+        job.details.update(transcript=transcription, context=selected_text, response_parts=parts, audio=audio,
+                           provider=", ".join(route for route in routes if route) or None)
+        return response
+
+    def _collect(self, deltas, parts):
+        """Pass a response stream through, keeping its text."""
+        for delta in deltas:
+            parts.append(delta)
+            yield delta
+
+    def _selected_text(self, context):
+        if context is None:
+            return self.text_inserter.get_selected_text()
+        try:
+            return context.result(timeout=2)
+        except Exception as e:
+            logger.warning(f"Selected text capture failed, continuing without it: {str(e)}")
+            return ""
+
+    def _process_recording(self, job, audio, session=None):
+        """Transcribe a recording. Runs on a pipeline worker."""
+        logger.info(f"Processing recording: {audio}")
+        transcription = self._transcribe(audio, session)
+
+        if transcription:
+            logger.info(f"Transcription successful: {transcription}")
+            job.details.update(transcript=transcription, audio=audio,
+                               provider=self.transcription_service.router.last_route)
+        else:
+            logger.warning("Empty transcription received")
+        return transcription
+
+    def _insert_text(self, text):
+        """Insert a finished job's text, or stream it in. Called in recording order."""
+        if not text:
+            return
+        if isinstance(text, str):
+            self.text_inserter.insert_text_with_shortcut(text)
+        else:
+            self.text_inserter.insert_stream(text)
+
+    def _on_processing_error(self, error):
+        """Report a failed job."""
+        logger.error(f"Error processing recording: {str(error)}")
+        rumps.alert("Error", str(error))
+
+    def _on_job_finished(self, job):
+        """Record end-to-end latency and reset the menu bar icon once nothing is left to process."""
+        stream = job.details.get("stream")
+        if stream is not None:
+            stream.close()
+        if job.state == job.DONE:
+            metrics.record("stop_to_text", time.time() - job.created_at, mode=job.name)
+            self._save_history(job)
+        if self.audio_recorder.is_recording:
+            return
+        self.title = "⏳" if self.pipeline.pending else "🎙️"
+
+    def _save_history(self, job):
+        """Queue a delivered job's transcript and response for the history database."""
+        details = job.details
+        if not details.get("transcript"):
+            return
+        parts = details.get("response_parts")
+        timings = {
+            "queued_ms": round((job.started_at - job.created_at) * 1000, 1),
+            "processing_ms": round((job.finished_at - job.started_at) * 1000, 1),
+            "stop_to_text_ms": round((time.time() - job.created_at) * 1000, 1),
+        }
+        audio = details.get("audio")
+        if audio is not None and audio.duration:
+            timings["audio_seconds"] = round(audio.duration, 2)
+        self.history.add(
+            job.name,
+            details["transcript"],
+            context=(details.get("context") or None) if self.history_context else None,
+            response="".join(parts) if parts is not None else None,
+            provider=details.get("provider"),
+            timings=timings,
+            audio=audio if self.history_audio else None
+        )
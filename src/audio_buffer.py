@@ -0,0 +1,180 @@
+import mmap
+import queue
+import tempfile
+import threading
+from typing import Optional
+
+
+class PCMBuffer:
+    """Preallocated, growable contiguous buffer for captured PCM audio.
+
+    Chunks are copied into a single bytearray at a write offset, so the
+    recording never exists as a list of small bytes objects and can be
+    handed on as a memoryview without joining.
+
+    Once more than `spill_threshold` bytes are captured, the audio moves to
+    an unlinked temporary file and later chunks are appended there, so
+    resident memory stays flat however long the recording runs. The file is
+    written by a background thread, so append() (called from the audio
+    callback) never waits on the disk. The view of a spilled recording is
+    memory-mapped from that file.
+    """
+
+    def __init__(self, initial_capacity: int = 1024 * 1024, spill_threshold: Optional[int] = None,
+                 spill_dir: Optional[str] = None):
+        self.initial_capacity = initial_capacity
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self._data = bytearray(initial_capacity)
+        self._length = 0
+        self._spill = None
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill is not None
+
+    def append(self, chunk: bytes):
+        """Copy a chunk to the end of the buffer, doubling capacity (or spilling to disk) when full."""
+        end = self._length + len(chunk)
+        if self._spill is None and self.spill_threshold is not None and end > self.spill_threshold:
+            self._start_spill()
+        if self._spill is not None:
+            # Kept until the writer thread gets to it, so a reused buffer must be copied
+            self._spill.write(bytes(chunk))
+            self._length = end
+            return
+        if end > len(self._data):
+            capacity = len(self._data) or 1
+            while capacity < end:
+                capacity *= 2
+            self._data.extend(bytes(capacity - len(self._data)))
+        self._data[self._length:end] = chunk
+        self._length = end
+
+    def _start_spill(self):
+        """Move the captured audio to an append-only temporary file and release the RAM."""
+        self._spill = _SpillWriter(self.spill_dir)
+        # The writer owns the old bytearray now and drops it once it is on disk
+        self._spill.write(memoryview(self._data)[:self._length])
+        self._data = bytearray(0)
+
+    def view(self) -> memoryview:
+        """Zero-copy view of the captured audio, only valid until the next append or clear.
+
+        Use detach() for audio that outlives the current recording.
+        """
+        if self._spill is None:
+            return memoryview(self._data)[:self._length]
+        if self._length == 0:
+            return memoryview(b"")
+        file = self._spill.flush()
+        return memoryview(mmap.mmap(file.fileno(), self._length, access=mmap.ACCESS_READ))
+
+    def detach(self) -> memoryview:
+        """Hand over the captured audio and start an empty buffer for the next recording.
+
+        The returned view stays valid while the next recording is captured;
+        a spilled file is deleted once the last view of it is released.
+        """
+        try:
+            view = self.view()
+        finally:
+            if self._spill is not None:
+                # The mapping keeps its own handle on the file
+                self._spill.close()
+                self._spill = None
+            self._data = bytearray(self.initial_capacity)
+            self._length = 0
+        return view
+
+    def clear(self):
+        """Forget the captured audio while keeping the allocated capacity."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            self._data = bytearray(self.initial_capacity)
+        self._length = 0
+
+
+class _SpillWriter:
+    """Appends spilled chunks to an unlinked temporary file on a background thread."""
+
+    def __init__(self, spill_dir: Optional[str] = None):
+        self.spill_dir = spill_dir
+        self._chunks = queue.Queue()
+        self._file = None
+        self._error = None
+        threading.Thread(target=self._run, name="pcm-spill", daemon=True).start()
+
+    def write(self, chunk):
+        self._chunks.put(chunk)
+
+    def flush(self):
+        """Wait until every chunk written so far is in the file, and return the file."""
+        self._chunks.join()
+        if self._error is not None:
+            raise self._error
+        self._file.flush()
+        return self._file
+
+    def close(self):
+        """Close (and so delete) the file once the writer is done with it."""
+        self._chunks.put(None)
+
+    def _run(self):
+        try:
+            self._file = tempfile.TemporaryFile(prefix="whishpy-", suffix=".pcm", dir=self.spill_dir,
+                                                buffering=256 * 1024)
+        except OSError as e:
+            self._error = e
+        while True:
+            chunk = self._chunks.get()
+            try:
+                if chunk is None:
+                    if self._file is not None:
+                        self._file.close()
+                    return
+                if self._error is None:
+                    self._file.write(chunk)
+            except OSError as e:
+                self._error = e
+            finally:
+                self._chunks.task_done()
+
+
+class RingBuffer:
+    """Fixed-size ring of the most recent PCM bytes, e.g. the pre-roll before a recording starts."""
+
+    def __init__(self, capacity: int):
+        self._data = bytearray(capacity)
+        self._end = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, chunk: bytes):
+        """Write a chunk, overwriting the oldest bytes once the ring is full."""
+        capacity = len(self._data)
+        if not capacity:
+            return
+        chunk = memoryview(chunk)[-capacity:]
+        first = min(len(chunk), capacity - self._end)
+        self._data[self._end:self._end + first] = chunk[:first]
+        self._data[:len(chunk) - first] = chunk[first:]
+        self._end = (self._end + len(chunk)) % capacity
+        self._length = min(capacity, self._length + len(chunk))
+
+    def snapshot(self) -> bytes:
+        """The buffered bytes, oldest first."""
+        start = self._end - self._length
+        if start >= 0:
+            return bytes(self._data[start:self._end])
+        return bytes(self._data[start:]) + bytes(self._data[:self._end])
+
+    def clear(self):
+        self._end = 0
+        self._length = 0
@@ -0,0 +1,162 @@
+import io
+import os
+import struct
+import wave
+from typing import TYPE_CHECKING, Optional
+from src.circular_logger import logger
+
+# NumPy takes ~100 ms to import, so it is only loaded by the functions that need it, off the launch path
+if TYPE_CHECKING:
+    import numpy as np
+
+# Whisper-family models resample everything to 16 kHz, so there is no point uploading more
+WHISPER_SAMPLE_RATE = 16000
+
+# Upload format per provider. Both accept FLAC, which is lossless and roughly halves speech PCM.
+PROVIDER_CODECS = {
+    "groq": "flac",
+    "openai": "flac",
+}
+
+# soundfile format/subtype and upload filename for each compressed codec
+_SOUNDFILE_FORMATS = {
+    "flac": ("FLAC", "PCM_16", "audio.flac"),
+    "opus": ("OGG", "OPUS", "audio.ogg"),
+}
+
+
+class EncodedAudio:
+    """An encoded audio payload held in memory and ready for upload.
+
+    The payload is encoded once and the same bytes object is reused for
+    every upload attempt. Audio produced by the recorder also keeps a view
+    of its raw PCM so it can be transcoded for a specific provider.
+
+    WAV payloads are built from the PCM only when `data` is first read, so
+    recordings that are transcoded or split before upload never copy it.
+    """
+
+    def __init__(self, data: Optional[bytes], filename: str, duration: float = 0.0, codec: Optional[str] = None,
+                 pcm=None, sample_rate: Optional[int] = None, channels: int = 1, sample_width: int = 2):
+        self._data = data
+        self.filename = filename
+        self.duration = duration
+        self.codec = codec or os.path.splitext(filename)[1].lstrip('.').lower()
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+
+    def __len__(self):
+        if self._data is None:
+            return _WAV_HEADER_SIZE + self.pcm_bytes
+        return len(self._data)
+
+    def __repr__(self):
+        return f"<EncodedAudio {self.filename} {len(self)} bytes {self.duration:.1f}s>"
+
+    @property
+    def data(self) -> bytes:
+        """The encoded payload, building the WAV container on first access."""
+        if self._data is None:
+            self._data = _wav_header(memoryview(self.pcm).nbytes, self.sample_rate, self.channels,
+                                     self.sample_width) + self.pcm
+        return self._data
+
+    @property
+    def pcm_bytes(self) -> int:
+        """Size of the uncompressed PCM this payload was encoded from."""
+        return memoryview(self.pcm).nbytes if self.pcm is not None else len(self.data)
+
+    @classmethod
+    def from_file(cls, path: str) -> "EncodedAudio":
+        """Read an existing audio file from disk.
+
+        16-bit PCM WAV files are also decoded, so they can be trimmed and
+        transcoded like recordings; other formats are uploaded as-is.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        filename = os.path.basename(path)
+        if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+            try:
+                with wave.open(io.BytesIO(data), 'rb') as wf:
+                    if wf.getsampwidth() == 2 and wf.getcomptype() == 'NONE':
+                        pcm = wf.readframes(wf.getnframes())
+                        rate, channels = wf.getframerate(), wf.getnchannels()
+                        return cls(data, filename, len(pcm) / (rate * channels * 2), "wav", pcm, rate, channels, 2)
+            except (wave.Error, EOFError) as e:
+                logger.warning(f"Could not decode {filename}, uploading as-is: {str(e)}")
+        return cls(data, filename)
+
+    def save(self, path: str) -> str:
+        """Write the payload to disk. Only needed when a file is explicitly requested."""
+        with open(path, "wb") as f:
+            f.write(self.data)
+        return path
+
+
+_WAV_HEADER_SIZE = 44
+
+def _wav_header(data_size: int, sample_rate: int, channels: int, sample_width: int) -> bytes:
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate,
+        sample_rate * channels * sample_width, channels * sample_width, sample_width * 8,
+        b'data', data_size
+    )
+
+
+def encode_wav(pcm, sample_rate: int, channels: int = 1, sample_width: int = 2) -> EncodedAudio:
+    """Wrap raw PCM (bytes or memoryview) in a WAV container, built lazily in memory."""
+    pcm = memoryview(pcm)
+    duration = pcm.nbytes / (sample_rate * channels * sample_width)
+    return EncodedAudio(None, "audio.wav", duration, "wav", pcm, sample_rate, channels, sample_width)
+
+
+def resample_pcm(pcm, from_rate: int, to_rate: int, channels: int = 1) -> "np.ndarray":
+    """Resample 16-bit PCM with linear interpolation, returning an int16 array of shape (frames, channels)."""
+    import numpy as np
+    samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    frames = int(len(samples) * to_rate / from_rate)
+    positions = np.arange(frames) * (from_rate / to_rate)
+    source = np.arange(len(samples))
+    resampled = np.empty((frames, channels), dtype=np.int16)
+    for channel in range(channels):
+        resampled[:, channel] = np.interp(positions, source, samples[:, channel])
+    return resampled
+
+
+def transcode(audio: EncodedAudio, codec: str, sample_rate: int = WHISPER_SAMPLE_RATE) -> EncodedAudio:
+    """Re-encode recorded audio as `codec` at `sample_rate`.
+
+    Payloads without raw PCM (e.g. files read from disk) are returned as-is.
+    Falls back to WAV when the codec is unavailable.
+    """
+    if audio.pcm is None or audio.sample_width != 2:
+        return audio
+    if audio.codec == codec and audio.sample_rate == sample_rate:
+        return audio
+
+    samples = resample_pcm(audio.pcm, audio.sample_rate, sample_rate, audio.channels)
+    if codec == "wav":
+        return encode_wav(samples.tobytes(), sample_rate, audio.channels)
+
+    try:
+        import soundfile
+    except ImportError:
+        logger.warning(f"soundfile is not installed, uploading WAV instead of {codec}")
+        return encode_wav(samples.tobytes(), sample_rate, audio.channels)
+
+    fmt, subtype, filename = _SOUNDFILE_FORMATS[codec]
+    out = io.BytesIO()
+    try:
+        soundfile.write(out, samples, sample_rate, format=fmt, subtype=subtype)
+    except Exception as e:
+        logger.warning(f"Encoding {codec} failed, uploading WAV instead: {str(e)}")
+        return encode_wav(samples.tobytes(), sample_rate, audio.channels)
+    return EncodedAudio(out.getvalue(), filename, len(samples) / sample_rate, codec,
+                        sample_rate=sample_rate, channels=audio.channels)
@@ -1,38 +1,96 @@
-import pyaudio
-import wave
-import tempfile
 import time
 import threading
-from src.circular_logger import logger, setup_logging
+from typing import Optional
+from src.audio_buffer import PCMBuffer, RingBuffer
+from src.audio_codec import EncodedAudio, WHISPER_SAMPLE_RATE, encode_wav
+from src.circular_logger import logger
+from src.metrics import metrics
+from src.startup_profile import startup_profile
+
+# Values of pyaudio.paInt16 and pyaudio.paContinue, so pyaudio is only imported when the device is opened
+PA_INT16 = 8
+PA_CONTINUE = 0
 
 class AudioRecorder:
-    def __init__(self, max_recording_time=None, stop_callback=None):
-        self.audio = None
+    def __init__(self, max_recording_time=None, stop_callback=None, frame_listener=None,
+                 sample_rate=WHISPER_SAMPLE_RATE, audio_interface=None, spill_after=300, pre_roll=0.5):
+        # A PyAudio-compatible object may be injected, e.g. a synthetic input for benchmarks
+        self.audio = audio_interface
         self.stream = None
-        self.frames = []
-        self.sample_rate = 44100
+        # Preferred capture rate; capture_rate is what the input device actually accepts
+        self.sample_rate = sample_rate
+        self.capture_rate = sample_rate
         self.chunk = 1024
-        self.format_type = pyaudio.paInt16
+        self.format_type = PA_INT16
         self.channels = 1
+        # Preallocate roughly one minute of audio; the buffer grows if needed and recordings
+        # longer than `spill_after` seconds continue in a temporary file instead of RAM
+        self.spill_after = spill_after
+        bytes_per_second = self.capture_rate * self.channels * 2
+        self.buffer = PCMBuffer(bytes_per_second * 60, spill_threshold=bytes_per_second * spill_after)
         self.is_recording = False
         self.start_time = 0
         self.max_recording_time = max_recording_time
         self.stop_callback = stop_callback
+        self.frame_listener = frame_listener
         self._lock = threading.Lock()
-        self._initialize_audio()
-        setup_logging()
+        self._init_lock = threading.Lock()
+        # Armed mode keeps the input stream open, holding the last `pre_roll` seconds in a ring buffer
+        self.pre_roll = pre_roll
+        self.armed = False
+        self.ring = None
+        self._capturing = False
+        self._capture_lock = threading.Lock()
+        # PyAudio scans every audio device, so that is left to warm_up() or the first recording
+        self._rate_checked = False
+
+    def warm_up(self):
+        """Open PyAudio and probe the input device ahead of the first recording."""
+        return self._initialize_audio()
 
     def _initialize_audio(self):
         """Initialize PyAudio instance if not already initialized."""
-        if self.audio is None:
-            try:
-                self.audio = pyaudio.PyAudio()
-            except Exception as e:
-                print(f"Failed to initialize PyAudio: {str(e)}")
-                self.audio = None
-                return False
+        with self._init_lock:
+            if self.audio is None:
+                try:
+                    pyaudio = startup_profile.import_module("pyaudio")
+                    with metrics.span("audio_init"):
+                        self.audio = pyaudio.PyAudio()
+                except Exception as e:
+                    print(f"Failed to initialize PyAudio: {str(e)}")
+                    self.audio = None
+                    return False
+            if not self._rate_checked:
+                self.capture_rate = self._supported_capture_rate()
+                self._rate_checked = True
+                self._size_buffer()
         return True
 
+    def _size_buffer(self):
+        """Size the capture buffer for the rate the device actually records at."""
+        bytes_per_second = self.capture_rate * self.channels * 2
+        self.buffer.initial_capacity = bytes_per_second * 60
+        self.buffer.spill_threshold = bytes_per_second * self.spill_after
+
+    def _supported_capture_rate(self):
+        """Return the preferred sample rate if the input device supports it, else its default rate."""
+        try:
+            device = self.audio.get_default_input_device_info()
+            self.audio.is_format_supported(
+                self.sample_rate,
+                input_device=device['index'],
+                input_channels=self.channels,
+                input_format=self.format_type
+            )
+            return self.sample_rate
+        except Exception as e:
+            try:
+                rate = int(self.audio.get_default_input_device_info()['defaultSampleRate'])
+            except Exception:
+                rate = 44100
+            logger.warning(f"Capturing at {rate} Hz, {self.sample_rate} Hz not supported: {str(e)}")
+            return rate
+
     def __del__(self):
         """Clean up resources when object is deleted."""
         self._cleanup()
@@ -48,21 +106,59 @@ class AudioRecorder:
         finally:
             self.stream = None
 
+    def _open_stream(self):
+        return self.audio.open(
+            format=self.format_type,
+            channels=self.channels,
+            rate=self.capture_rate,
+            input=True,
+            frames_per_buffer=self.chunk,
+            stream_callback=self.audio_callback
+        )
+
+    def arm(self) -> bool:
+        """Keep the input stream open so recordings start instantly, including the pre-roll."""
+        if self.armed:
+            return True
+        if not self._initialize_audio():
+            return False
+        try:
+            self.ring = RingBuffer(int(self.capture_rate * self.pre_roll) * self.channels * 2)
+            if self.stream is None:
+                self.stream = self._open_stream()
+        except Exception as e:
+            logger.error(f"Failed to arm input stream: {str(e)}")
+            self.ring = None
+            return False
+        self.armed = True
+        logger.info(f"Input stream armed with {self.pre_roll:.1f}s pre-roll")
+        return True
+
+    def disarm(self):
+        """Close the armed input stream, or leave it to the current recording to close."""
+        self.armed = False
+        self.ring = None
+        if not self.is_recording:
+            self._cleanup()
+
     def start_recording(self):
         """Start audio recording."""
         if self.is_recording or not self._initialize_audio():
             return False
 
         try:
-            self.frames = []
-            self.stream = self.audio.open(
-                format=self.format_type,
-                channels=self.channels,
-                rate=self.sample_rate,
-                input=True,
-                frames_per_buffer=self.chunk,
-                stream_callback=self.audio_callback
-            )
+            with self._capture_lock:
+                self.buffer.clear()
+                if self.armed and self.stream is not None:
+                    # The stream is already running: begin with the audio from just before the start
+                    pre_roll = self.ring.snapshot()
+                    self.ring.clear()
+                    if pre_roll:
+                        self.buffer.append(pre_roll)
+                        self._notify_listener(pre_roll)
+                self._capturing = True
+            if self.stream is None:
+                self.stream = self._open_stream()
             self.is_recording = True
             self.start_time = time.time()
             
@@ -75,9 +171,9 @@ class AudioRecorder:
                     logger.info(f"Timer completed after {elapsed:.2f} seconds")
                     with self._lock:
                         if self.is_recording:
-                            audio_file = self.stop_recording()
-                            if self.stop_callback and audio_file:
-                                self.stop_callback(audio_file)
+                            audio = self.stop_recording()
+                            if self.stop_callback and audio:
+                                self.stop_callback(audio)
                 
                 timer_thread = threading.Thread(target=timer)
                 timer_thread.daemon = True
@@ -86,45 +182,61 @@ class AudioRecorder:
             return True
         except Exception as e:
             print(f"Start recording error: {str(e)}")
+            self._capturing = False
             self._cleanup()
             return False
 
-    def stop_recording(self):
-        """Stop audio recording and return the recorded audio file path."""
+    def stop_recording(self, save_path: Optional[str] = None) -> Optional[EncodedAudio]:
+        """Stop audio recording and return the encoded audio in memory.
+
+        The recording is only written to disk when `save_path` is given.
+        """
         if not self.is_recording:
             return None
 
         try:
-            # Updated duration check using captured frames
-            duration = (len(self.frames) * self.chunk) / self.sample_rate
-            if not self.frames or duration < 1.0:
+            # Stop capturing before reading the buffer; an armed stream keeps filling the pre-roll
+            with self._capture_lock:
+                self._capturing = False
+            if not self.armed:
                 self._cleanup()
+            sample_width = self.audio.get_sample_size(self.format_type)
+            duration = len(self.buffer) / (self.capture_rate * self.channels * sample_width)
+            if duration < 1.0:
                 self.is_recording = False
                 raise ValueError("Recording must be at least 1 second long")
 
-            # Save to temp file
-            temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-            temp_filename = temp_file.name
-            temp_file.close()
-
-            with wave.open(temp_filename, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(self.audio.get_sample_size(self.format_type))
-                wf.setframerate(self.sample_rate)
-                wf.writeframes(b''.join(self.frames))
-
-            return temp_filename
+            with metrics.span("stop_recording", audio_seconds=round(duration, 2)):
+                # The audio is handed over, so the next recording cannot overwrite it while it is processed
+                audio = encode_wav(self.buffer.detach(), self.capture_rate, self.channels, sample_width)
+                if save_path:
+                    audio.save(save_path)
+            return audio
         except Exception as e:
             print(f"Stop recording error: {str(e)}")
             return None
         finally:
-            self._cleanup()
+            if not self.armed:
+                self._cleanup()
             self.is_recording = False
 
+    def _notify_listener(self, data):
+        if self.frame_listener:
+            try:
+                self.frame_listener(data)
+            except Exception as e:
+                logger.error(f"Frame listener error: {str(e)}")
+
     def audio_callback(self, in_data, frame_count, time_info, status):
-        """Audio stream callback to collect frames."""
-        self.frames.append(in_data)
-        return (in_data, pyaudio.paContinue)
+        """Audio stream callback to collect frames, or the pre-roll while armed and idle."""
+        with self._capture_lock:
+            if not self._capturing:
+                if self.ring is not None:
+                    self.ring.append(in_data)
+                return (in_data, PA_CONTINUE)
+            self.buffer.append(in_data)
+        self._notify_listener(in_data)
+        return (in_data, PA_CONTINUE)
 
     def get_recording_duration(self):
         """Get the duration of the current recording."""
@@ -0,0 +1,222 @@
+"""Headless batch transcription of a directory or manifest of audio files.
+
+    python main.py transcribe ~/meetings --workers 8 --output meetings.jsonl
+
+Uses the same ~/.whishpy/config.json providers and settings as the menu bar
+app. Each result is written as one JSON line; completed paths are appended
+to a checkpoint file, so re-running the same command resumes where it left off.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, Optional, Set
+from src.circular_logger import logger
+from src.retry import retry_after, status_code
+
+# The first load of a local model may include downloading it
+LOCAL_LOAD_TIMEOUT = 600
+
+AUDIO_EXTENSIONS = {".wav", ".flac", ".mp3", ".m4a", ".mp4", ".mpeg", ".mpga", ".ogg", ".opus", ".webm"}
+
+
+class AdaptiveLimit:
+    """Concurrency limit that halves on rate-limit errors and creeps back up on success.
+
+    Workers call `acquire()` before each request and `release(rate_limited, backoff)`
+    after it. After a 429 no new request starts until the server's Retry-After
+    has passed.
+    """
+
+    def __init__(self, maximum: int, recover_after: int = 10):
+        self.maximum = maximum
+        self.limit = maximum
+        self.recover_after = recover_after
+        self.active = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0 and self.active < self.limit:
+                    self.active += 1
+                    return
+                self._condition.wait(pause if pause > 0 else None)
+
+    def release(self, rate_limited: bool = False, backoff: Optional[float] = None):
+        with self._condition:
+            self.active -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+                self._paused_until = max(self._paused_until, time.monotonic() + (backoff or 1.0))
+                logger.warning(f"Rate limited, concurrency lowered to {self.limit}")
+            else:
+                self._successes += 1
+                if self.limit < self.maximum and self._successes >= self.recover_after:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+def iter_audio_files(source: str) -> Iterator[str]:
+    """Yield audio paths from a directory (recursively, in sorted order) or a manifest file.
+
+    A manifest has one path per line, or JSON lines with a "path" key;
+    relative paths are resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    yield os.path.join(root, name)
+        return
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            path = json.loads(line)["path"] if line.startswith('{') else line
+            yield os.path.join(base, os.path.expanduser(path))
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Paths that already have a result."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r') as f:
+        return {line.rstrip('\n') for line in f if line.strip()}
+
+
+def _root_error(error: Exception) -> Exception:
+    """The provider error behind a RetryError, if any."""
+    return getattr(error, "last_error", None) or error
+
+
+class BatchTranscriber:
+    """Streams files through a bounded worker pool and appends JSONL results."""
+
+    def __init__(self, service, workers: int = 4, output=None, checkpoint_path: Optional[str] = None):
+        self.service = service
+        self.workers = workers
+        self.limit = AdaptiveLimit(workers)
+        self.output = output or sys.stdout
+        self.checkpoint_path = checkpoint_path
+        self.done = load_checkpoint(checkpoint_path) if checkpoint_path else set()
+        self.counts = {"ok": 0, "failed": 0, "skipped": 0}
+        self._write_lock = threading.Lock()
+        self._checkpoint = open(checkpoint_path, 'a') if checkpoint_path else None
+
+    def _transcribe(self, path: str) -> dict:
+        from src.audio_codec import EncodedAudio
+        started = time.perf_counter()
+        record = {"path": path}
+        self.limit.acquire()
+        rate_limited, backoff = False, None
+        try:
+            audio = EncodedAudio.from_file(path)
+            if audio.duration:
+                record["duration_s"] = round(audio.duration, 2)
+            record["text"] = self.service.vocabulary.apply(self.service.transcribe_audio(audio))
+        except Exception as e:
+            error = _root_error(e)
+            rate_limited = status_code(error) == 429
+            backoff = retry_after(error)
+            record["error"] = str(e)
+        finally:
+            self.limit.release(rate_limited, backoff)
+        record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return record
+
+    def _write(self, record: dict):
+        with self._write_lock:
+            self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.output.flush()
+            if "error" in record:
+                self.counts["failed"] += 1
+                return
+            self.counts["ok"] += 1
+            # Failed files are not checkpointed, so a re-run tries them again.
+            # Checkpoint only after the result line is flushed, so a crash never loses a result
+            if self._checkpoint:
+                self._checkpoint.write(record["path"] + "\n")
+                self._checkpoint.flush()
+
+    def run(self, paths: Iterator[str]) -> dict:
+        """Transcribe every path not yet checkpointed; returns ok/failed/skipped counts."""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            pending = set()
+            for path in paths:
+                if path in self.done:
+                    self.counts["skipped"] += 1
+                    continue
+                # Keep only a couple of files per worker in flight, however long the listing is
+                while len(pending) >= self.workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._write(future.result())
+                pending.add(executor.submit(self._transcribe, path))
+            for future in pending:
+                self._write(future.result())
+        if self._checkpoint:
+            self._checkpoint.close()
+        elapsed = time.perf_counter() - started
+        logger.info(f"Batch transcription finished in {elapsed:.1f}s: {self.counts}")
+        return dict(self.counts, elapsed_s=round(elapsed, 1))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="main.py transcribe",
+                                     description="Transcribe a directory or manifest of audio files to JSONL")
+    parser.add_argument("source", help="directory of audio files, or a manifest with one path (or JSON line) each")
+    parser.add_argument("--workers", type=int, default=4, help="maximum concurrent requests")
+    parser.add_argument("--output", "-o", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("--checkpoint", help="completed-paths file used to resume "
+                                             "(default: OUTPUT.checkpoint when writing to a file)")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    checkpoint = args.checkpoint or (f"{args.output}.checkpoint" if args.output != "-" else None)
+
+    from src.transcription_service import TranscriptionService
+    service = TranscriptionService(interactive=False)
+    service.warm_up()
+    if not service.api_keys and not service.local_enabled:
+        print("No provider configured: set an API key in the menu bar app or ~/.whishpy/config.json",
+              file=sys.stderr)
+        return 2
+    if not service.api_keys:
+        # The local model is the only route, so no file can be transcribed until it has loaded
+        local = service.local_whisper
+        logger.info(f"Waiting for local model {local.model_size} to load")
+        if not local.wait_until_ready(LOCAL_LOAD_TIMEOUT):
+            print(f"Local model {local.model_size} did not load: {local.error or 'timed out'}", file=sys.stderr)
+            return 2
+    # Hedged duplicates only burn rate limit when throughput, not latency, matters, and
+    # files may wait a few quota windows instead of failing
+    service.router.hedge = False
+    service.latency_budget = 300
+
+    output = open(args.output, 'a', encoding='utf-8') if args.output != "-" else sys.stdout
+    try:
+        counts = BatchTranscriber(service, args.workers, output, checkpoint).run(iter_audio_files(args.source))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps(counts), file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,105 +1,127 @@
+import json
 import logging
-import os
 import sys
 import threading
-import asyncio
-from datetime import datetime
-from queue import Queue
+import time
+from collections import deque
+from queue import Empty, Queue
 from pathlib import Path
+from typing import List
+from src.log_store import LogRecord, LogStore
+
+def default_log_dir() -> Path:
+    """Where log segments are kept, for both development and the bundled app"""
+    if getattr(sys, 'frozen', False):
+        # Running in py2app bundle
+        return Path.home() / '.whishpy' / 'logs'
+    # Running in development
+    return Path('whishpy-logs')
+
 
 class CircularLogger:
-    def __init__(self, max_size=1024*90, log_file=None):  # 90kb default
-        if log_file is None:
-            # Use appropriate log path for both development and bundled app
-            if getattr(sys, 'frozen', False):
-                # Running in py2app bundle
-                log_file = Path.home() / '.whishpy' / 'whishpy.log'
-            else:
-                # Running in development
-                log_file = 'whishpy.log'
+    """Logger keeping a bounded in-memory tail and writing JSON lines to an indexed LogStore.
+
+    Entries are encoded once on the calling thread; a background thread
+    appends them to segments in batches. `query()` searches everything
+    still retained on disk by level, time range and substring.
+    """
+
+    def __init__(self, max_size=1024*90, log_dir=None, batch_size=256, segment_size=1024*1024,
+                 retention=16*1024*1024):  # 90kb in-memory tail by default
         self.max_size = max_size
-        self.log_file = log_file
-        self.buffer = []
+        self.log_dir = Path(log_dir) if log_dir is not None else default_log_dir()
+        self.batch_size = batch_size
+        self.store = LogStore(self.log_dir, segment_size=segment_size, retention=retention)
+        # In-memory tail of encoded entries; popleft makes eviction O(1)
+        self.buffer = deque()
         self.current_size = 0
         self.lock = threading.Lock()
         self.write_queue = Queue()
         self.writer_thread = threading.Thread(target=self._file_writer, daemon=True)
         self.writer_thread.start()
-        
+
     def _log(self, level, message):
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_entry = f"[{timestamp}] [{level}] {message}\n"
-        entry_size = len(log_entry.encode('utf-8'))
-        
+        # Encode once; the same bytes go to the in-memory tail and the file writer
+        ts = round(time.time(), 3)
+        log_entry = (json.dumps({"ts": ts, "level": level, "msg": str(message)}) + "\n").encode('utf-8')
+        entry_size = len(log_entry)
+
         with self.lock:
-            # Check if adding this entry would exceed max size
-            if self.current_size + entry_size > self.max_size:
-                # Remove oldest entries until we have space
-                while self.buffer and (self.current_size + entry_size > self.max_size):
-                    removed = self.buffer.pop(0)
-                    self.current_size -= len(removed.encode('utf-8'))
-            
+            # Remove oldest entries until we have space
+            while self.buffer and (self.current_size + entry_size > self.max_size):
+                self.current_size -= len(self.buffer.popleft())
+
             self.buffer.append(log_entry)
             self.current_size += entry_size
-            self.write_queue.put(log_entry)
-    
+        self.write_queue.put((ts, level, log_entry))
+
     def debug(self, message):
         self._log('DEBUG', message)
-    
+
     def info(self, message):
         self._log('INFO', message)
-    
+
     def warning(self, message):
         self._log('WARNING', message)
-    
+
     def error(self, message):
         self._log('ERROR', message)
-    
+
     def get_logs(self):
+        """The in-memory tail as `[timestamp] [LEVEL] message` lines"""
         with self.lock:
-            return ''.join(self.buffer)
-    
+            entries = list(self.buffer)
+        return "".join(_entry_text(entry) for entry in entries)
+
+    def query(self, level=None, since=None, until=None, contains=None, limit=None) -> List[LogRecord]:
+        """Search retained logs; see LogStore.query. Entries still queued are written first."""
+        self.flush()
+        return self.store.query(level, since, until, contains, limit)
+
     def clear_logs(self):
         with self.lock:
-            self.buffer = []
+            self.buffer = deque()
             self.current_size = 0
-    
+
+    def flush(self):
+        """Block until every queued entry has been written to the log store"""
+        self.write_queue.join()
+
     def _file_writer(self):
-        """Background thread that writes logs to file"""
+        """Background thread that drains the queue in batches to the active segment"""
         while True:
-            log_entry = self.write_queue.get()
+            batch = [self.write_queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.write_queue.get_nowait())
+            except Empty:
+                pass
             try:
-                with open(self.log_file, 'a') as f:
-                    f.write(log_entry)
-                    # Check file size and rotate if needed
-                    if os.path.getsize(self.log_file) > self.max_size:
-                        self._rotate_log()
+                self.store.write(batch)
             except Exception as e:
                 print(f"Error writing to log file: {e}")
+                self.store.reset()
             finally:
-                self.write_queue.task_done()
-    
-    def _rotate_log(self):
-        """Rotate the log file when it reaches max size"""
-        try:
-            with self.lock:
-                if os.path.exists(self.log_file):
-                    # Create backup of current log
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    backup_file = f"{self.log_file}.{timestamp}"
-                    os.rename(self.log_file, backup_file)
-                    
-                    # Write remaining buffer to new log file
-                    with open(self.log_file, 'w') as f:
-                        f.write(''.join(self.buffer))
-        except Exception as e:
-            print(f"Error rotating log file: {e}")
+                for _ in batch:
+                    self.write_queue.task_done()
+
+
+def _entry_text(entry: bytes) -> str:
+    """Format one encoded entry as a classic log line"""
+    record = json.loads(entry)
+    return LogRecord(record["ts"], record["level"], record["msg"]).format() + "\n"
 
 # Create a global logger instance
 logger = CircularLogger()
 
+_logging_configured = False
+
 def setup_logging():
-    # Configure standard logging to use our circular logger
+    # Configure standard logging to use our circular logger; later calls are no-ops
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s [%(levelname)s] %(message)s',
@@ -113,5 +135,5 @@ class CircularLogHandler(logging.Handler):
 
     def close(self):
         # Wait for all queued logs to be written before closing
-        logger.write_queue.join()
+        logger.flush()
         super().close()
@@ -2,6 +2,14 @@ from .settings_manager import SettingsManager
 
 settings_manager = SettingsManager()
 
+def subscribe(key, callback):
+    """Call callback(new_value) whenever the setting changes"""
+    settings_manager.subscribe(key, callback)
+
+def flush_settings():
+    """Wait briefly for pending settings to be written to disk"""
+    settings_manager.flush(timeout=2)
+
 def save_api_key(api_key, provider="groq"):
     """Save API key and provider to config file"""
     settings_manager.save_api_key(api_key, provider)
@@ -10,6 +18,10 @@ def load_api_key():
     """Load API key and provider from config file if it exists"""
     return settings_manager.load_api_key()
 
+def load_api_keys():
+    """Load the API keys of all configured providers from config file"""
+    return settings_manager.load_api_keys()
+
 def save_max_recording_time(max_time):
     """Save max recording time to config file"""
     settings_manager.save_max_recording_time(max_time)
@@ -17,3 +29,87 @@ def save_max_recording_time(max_time):
 def load_max_recording_time():
     """Load max recording time from config file if it exists"""
     return settings_manager.load_max_recording_time()
+
+def save_streaming_enabled(enabled):
+    """Save streaming transcription setting to config file"""
+    settings_manager.save_streaming_enabled(enabled)
+
+def load_streaming_enabled():
+    """Load streaming transcription setting from config file"""
+    return settings_manager.load_streaming_enabled()
+
+def load_sample_rate():
+    """Load capture/upload sample rate from config file"""
+    return settings_manager.load_sample_rate()
+
+def load_audio_codec():
+    """Load upload codec override from config file"""
+    return settings_manager.load_audio_codec()
+
+def save_vad_enabled(enabled):
+    """Save silence trimming setting to config file"""
+    settings_manager.save_vad_enabled(enabled)
+
+def load_vad_enabled():
+    """Load silence trimming setting from config file"""
+    return settings_manager.load_vad_enabled()
+
+def save_hedging_enabled(enabled):
+    """Save request hedging setting to config file"""
+    settings_manager.save_hedging_enabled(enabled)
+
+def load_hedging_enabled():
+    """Load request hedging setting from config file"""
+    return settings_manager.load_hedging_enabled()
+
+def save_stream_responses(enabled):
+    """Save streaming AI response setting to config file"""
+    settings_manager.save_stream_responses(enabled)
+
+def load_stream_responses():
+    """Load streaming AI response setting from config file"""
+    return settings_manager.load_stream_responses()
+
+def save_local_transcription(enabled):
+    """Save whether local transcription is enabled"""
+    settings_manager.save_local_transcription(enabled)
+
+def load_local_transcription():
+    """Load whether local transcription is enabled"""
+    return settings_manager.load_local_transcription()
+
+def load_local_model():
+    """Load the local Whisper model size or path"""
+    return settings_manager.load_local_model()
+
+def save_push_to_talk(enabled):
+    """Save whether push-to-talk is enabled"""
+    settings_manager.save_push_to_talk(enabled)
+
+def load_push_to_talk():
+    """Load whether push-to-talk is enabled"""
+    return settings_manager.load_push_to_talk()
+
+def load_push_to_talk_hotkey():
+    """Load the push-to-talk key combination"""
+    return settings_manager.load_push_to_talk_hotkey()
+
+def load_context_token_budget():
+    """Load the token budget for selected text sent with a prompt"""
+    return settings_manager.load_context_token_budget()
+
+def load_history_audio():
+    """Load whether recordings are saved in the history"""
+    return settings_manager.load_history_audio()
+
+def load_history_context():
+    """Load whether prompt context is saved in the history"""
+    return settings_manager.load_history_context()
+
+def load_vocabulary():
+    """Load the custom vocabulary terms"""
+    return settings_manager.load_vocabulary()
+
+def load_replacements():
+    """Load the spoken-phrase replacements and snippets"""
+    return settings_manager.load_replacements()
@@ -0,0 +1,168 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+_WORDS = re.compile(r"[A-Za-z]+")
+_DIGITS = re.compile(r"\d+")
+_SYMBOLS = re.compile(r"[^\w\s]")
+_NEWLINES = re.compile(r"\n+")
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+_TERMS = re.compile(r"[a-z0-9]{3,}")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Words too common to say anything about which part of the selection the prompt is about
+_STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "all", "can", "this", "that", "with", "have", "from",
+    "they", "will", "would", "there", "their", "what", "about", "which", "when", "make", "like", "just",
+    "into", "some", "could", "them", "than", "then", "its", "was", "were", "been", "has", "had", "how",
+    "please", "text", "write", "rewrite", "more", "less", "using", "use", "selected", "selection",
+}
+
+GAP_MARKER = "\n[...]\n"
+
+
+class TokenEstimator:
+    """Fast approximate token count for a BPE tokenizer, without loading its vocabulary.
+
+    Common words are one token and longer ones split roughly every
+    `word_chars` letters; digits group in threes; symbols, newline runs
+    and non-ASCII characters count about one each. `margin` errs on the
+    side of overestimating so budgets are not overshot.
+    """
+
+    def __init__(self, word_chars: float = 5.0, non_ascii_per_token: float = 1.0, margin: float = 1.1):
+        self.word_chars = word_chars
+        self.non_ascii_per_token = non_ascii_per_token
+        self.margin = margin
+        # Only words long enough to split need a closer look
+        self._long_words = re.compile(r"[A-Za-z]{%d,}" % (int(word_chars) + 1))
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        tokens = len(_WORDS.findall(text))
+        tokens += sum(int((len(word) - 1) // self.word_chars) for word in self._long_words.findall(text))
+        tokens += sum(math.ceil(len(digits) / 3) for digits in _DIGITS.findall(text))
+        tokens += len(_SYMBOLS.findall(text)) + len(_NEWLINES.findall(text))
+        tokens += len(_NON_ASCII.findall(text)) / self.non_ascii_per_token
+        return math.ceil(tokens * self.margin)
+
+
+# Both chat models use large (128k/200k) BPE vocabularies that keep most English words whole
+ESTIMATORS: Dict[str, TokenEstimator] = {
+    "llama-3.3-70b-versatile": TokenEstimator(word_chars=5.0),
+    "gpt-4o-mini-2024-07-18": TokenEstimator(word_chars=5.5),
+}
+_DEFAULT_ESTIMATOR = TokenEstimator(word_chars=4.0, margin=1.2)
+
+
+def estimator_for(model: str) -> TokenEstimator:
+    return ESTIMATORS.get(model, _DEFAULT_ESTIMATOR)
+
+
+class PackedContext:
+    """Context text trimmed to a token budget, with what was sent and what was dropped."""
+
+    def __init__(self, text: str, tokens: int, original_tokens: int):
+        self.text = text
+        self.tokens = tokens
+        self.original_tokens = original_tokens
+
+    @property
+    def trimmed(self) -> bool:
+        return self.tokens < self.original_tokens
+
+
+def _chunks(context: str, estimator: TokenEstimator, max_tokens: int) -> List[str]:
+    """Split into paragraphs, breaking oversized ones at sentence ends and then by length."""
+    chunks = []
+    for paragraph in re.split(r"\n\s*\n", context):
+        if not paragraph.strip():
+            continue
+        if estimator.count(paragraph) <= max_tokens:
+            chunks.append(paragraph)
+            continue
+        current, current_tokens = [], 0
+        for sentence in _SENTENCE_END.split(paragraph):
+            tokens = estimator.count(sentence)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            if tokens > max_tokens:
+                # A single huge "sentence" (code, a table) is cut into fixed-size windows
+                width = max(1, len(sentence) * max_tokens // tokens)
+                chunks.extend(sentence[start:start + width] for start in range(0, len(sentence), width))
+                continue
+            current.append(sentence)
+            current_tokens += tokens
+        if current:
+            chunks.append(" ".join(current))
+    return chunks
+
+
+def _relevance(prompt: str, chunks: List[str]) -> List[float]:
+    """BM25-style overlap between the spoken prompt's terms and each chunk."""
+    terms = {term for term in _TERMS.findall(prompt.lower()) if term not in _STOPWORDS}
+    if not terms:
+        return [0.0] * len(chunks)
+    counts = [Counter(_TERMS.findall(chunk.lower())) for chunk in chunks]
+    average_length = sum(sum(count.values()) for count in counts) / len(counts) or 1
+    idf = {}
+    for term in terms:
+        documents = sum(1 for count in counts if term in count)
+        idf[term] = math.log(1 + (len(counts) - documents + 0.5) / (documents + 0.5))
+    scores = []
+    for count in counts:
+        length = sum(count.values())
+        score = 0.0
+        for term in terms:
+            frequency = count.get(term, 0)
+            if frequency:
+                score += idf[term] * frequency * 2.2 / (frequency + 1.2 * (0.25 + 0.75 * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def pack_context(prompt: str, context: str, model: str, budget: int) -> PackedContext:
+    """Fit `context` into `budget` tokens, keeping the parts most relevant to `prompt`.
+
+    Chunks mentioning the prompt's terms are kept first; ties (and prompts
+    such as "summarize this" with no usable terms) fall back to the start
+    and end of the selection. Kept chunks stay in their original order,
+    with a marker where text was left out.
+    """
+    estimator = estimator_for(model)
+    original = estimator.count(context)
+    if original <= budget:
+        return PackedContext(context, original, original)
+
+    chunks = _chunks(context, estimator, max(16, budget // 8))
+    sizes = [estimator.count(chunk) for chunk in chunks]
+    scores = _relevance(prompt, chunks)
+    # Position bonus: beginnings and ends of documents carry titles, intros and conclusions
+    order = sorted(range(len(chunks)), key=lambda i: (-scores[i], min(i, len(chunks) - 1 - i)))
+
+    # Parts are joined by blank lines, with one marker per run of dropped chunks. Estimates of
+    # the parts add up to at least the estimate of the joined text, so `used` never undercounts.
+    separator = estimator.count("\n\n")
+    marker = estimator.count(GAP_MARKER.strip())
+    kept, used = set(), marker
+    for i in order:
+        # Keeping a chunk splits the run of dropped chunks around it into up to two runs
+        markers = (i > 0 and i - 1 not in kept) + (i < len(chunks) - 1 and i + 1 not in kept) - 1
+        cost = sizes[i] + separator * (1 + markers) + marker * markers
+        if used + cost <= budget:
+            kept.add(i)
+            used += cost
+
+    parts, previous = [], -1
+    for i in sorted(kept):
+        if i != previous + 1:
+            parts.append(GAP_MARKER.strip())
+        parts.append(chunks[i])
+        previous = i
+    if previous != len(chunks) - 1:
+        parts.append(GAP_MARKER.strip())
+    text = "\n\n".join(parts)
+    return PackedContext(text, estimator.count(text), original)
@@ -0,0 +1,221 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from queue import Queue
+from typing import List, Optional
+from src.circular_logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    transcript TEXT NOT NULL,
+    context TEXT,
+    response TEXT,
+    provider TEXT,
+    timings TEXT,
+    audio BLOB,
+    audio_codec TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_created_at ON entries (created_at);
+"""
+
+# External-content full-text index over the entries table, kept in step by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    transcript, response, content='entries', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, transcript, response) VALUES (new.id, new.transcript, new.response);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, transcript, response)
+    VALUES ('delete', old.id, old.transcript, old.response);
+END;
+"""
+
+_COLUMNS = ("entries.id, entries.created_at, entries.kind, entries.transcript, entries.context, entries.response, "
+            "entries.provider, entries.timings")
+_SEARCH_TERMS = re.compile(r"\w+", re.UNICODE)
+
+
+class HistoryEntry:
+    """One dictation or AI response, as stored in the history database."""
+
+    def __init__(self, id: int, created_at: float, kind: str, transcript: str, context: Optional[str] = None,
+                 response: Optional[str] = None, provider: Optional[str] = None, timings: Optional[str] = None):
+        self.id = id
+        self.created_at = created_at
+        self.kind = kind
+        self.transcript = transcript
+        self.context = context
+        self.response = response
+        self.provider = provider
+        self.timings = json.loads(timings) if timings else {}
+
+    def __repr__(self):
+        return f"<HistoryEntry {self.id} {self.kind} {self.title!r}>"
+
+    @property
+    def text(self) -> str:
+        """What was inserted: the AI response for prompts, otherwise the transcript."""
+        return self.response if self.response is not None else self.transcript
+
+    @property
+    def title(self) -> str:
+        """Single-line preview for menus."""
+        text = " ".join(self.text.split())
+        return text if len(text) <= 50 else text[:49] + "…"
+
+
+class HistoryStore:
+    """Persistent, searchable history of transcriptions and AI responses in SQLite.
+
+    `add()` only queues the record; a background thread writes queued
+    records in one transaction, so saving never delays inserting the text.
+    Transcripts and responses are indexed with FTS5 for `search()`.
+
+    Only the newest `max_entries` are kept, and audio (if saved) only for
+    the newest `audio_entries`.
+    """
+
+    def __init__(self, path=None, max_entries: int = 10000, audio_entries: int = 100):
+        self.path = path or Path.home() / '.whishpy' / 'history.db'
+        self.max_entries = max_entries
+        self.audio_entries = audio_entries
+        self.fts = True
+        # Bumped after every commit, so readers can tell when their view is stale
+        self.version = 0
+        self._queue = Queue()
+        self._ready = threading.Event()
+        self._writer_thread = threading.Thread(target=self._writer, name="history-writer", daemon=True)
+        self._writer_thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # Write-ahead logging lets the menu read while the writer commits
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        try:
+            conn.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            # SQLite builds without FTS5 fall back to substring search
+            self.fts = False
+            logger.warning(f"Full-text search unavailable, history search will be slower: {str(e)}")
+
+    def add(self, kind: str, transcript: str, context: Optional[str] = None, response: Optional[str] = None,
+            provider: Optional[str] = None, timings: Optional[dict] = None, audio=None):
+        """Queue a record for writing. `audio` (an EncodedAudio) is compressed on the writer thread."""
+        self._queue.put({"created_at": time.time(), "kind": kind, "transcript": transcript, "context": context,
+                         "response": response, "provider": provider, "timings": timings, "audio": audio})
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until every queued record is written."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _writer(self):
+        """Background thread that commits queued records in batches"""
+        conn = None
+        try:
+            conn = self._connect()
+            self._create_schema(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Error opening history database: {str(e)}")
+        finally:
+            self._ready.set()
+        while True:
+            records = [self._queue.get()]
+            while not self._queue.empty():
+                records.append(self._queue.get_nowait())
+            flushes = [record for record in records if isinstance(record, threading.Event)]
+            records = [record for record in records if not isinstance(record, threading.Event)]
+            try:
+                if conn is not None and records:
+                    self._write(conn, records)
+                    self.version += 1
+            except Exception as e:
+                logger.error(f"Error saving history: {str(e)}")
+            for done in flushes:
+                done.set()
+
+    def _write(self, conn: sqlite3.Connection, records: list):
+        rows = []
+        for record in records:
+            audio, codec = self._compress(record.pop("audio"))
+            timings = json.dumps(record["timings"]) if record["timings"] else None
+            rows.append((record["created_at"], record["kind"], record["transcript"], record["context"],
+                         record["response"], record["provider"], timings, audio, codec))
+        with conn:
+            conn.executemany(
+                "INSERT INTO entries (created_at, kind, transcript, context, response, provider, timings, "
+                "audio, audio_codec) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            newest = conn.execute("SELECT MAX(id) FROM entries").fetchone()[0]
+            conn.execute("DELETE FROM entries WHERE id <= ?", (newest - self.max_entries,))
+            conn.execute("UPDATE entries SET audio = NULL, audio_codec = NULL WHERE id <= ? AND audio IS NOT NULL",
+                         (newest - self.audio_entries,))
+
+    def _compress(self, audio):
+        if audio is None:
+            return None, None
+        from src.audio_codec import transcode
+        try:
+            encoded = transcode(audio, "opus")
+            return encoded.data, encoded.codec
+        except Exception as e:
+            logger.warning(f"Could not compress audio for history: {str(e)}")
+            return None, None
+
+    def _query(self, sql: str, params: tuple = ()) -> List[HistoryEntry]:
+        self._ready.wait(5)
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            logger.error(f"Error opening history database: {str(e)}")
+            return []
+        try:
+            return [HistoryEntry(*row) for row in conn.execute(sql, params)]
+        except sqlite3.Error as e:
+            logger.error(f"Error reading history: {str(e)}")
+            return []
+        finally:
+            conn.close()
+
+    def recent(self, limit: int = 10) -> List[HistoryEntry]:
+        """The newest entries, newest first."""
+        return self._query(f"SELECT {_COLUMNS} FROM entries ORDER BY id DESC LIMIT ?", (limit,))
+
+    def search(self, query: str, limit: int = 10) -> List[HistoryEntry]:
+        """Entries whose transcript or response contains every word of `query` (as a prefix), best match first."""
+        terms = _SEARCH_TERMS.findall(query)
+        if not terms:
+            return []
+        if self.fts:
+            # Each word is quoted, so user input is never parsed as FTS query syntax
+            match = " ".join(f'"{term}"*' for term in terms)
+            return self._query(
+                f"SELECT {_COLUMNS} FROM entries_fts JOIN entries ON entries.id = entries_fts.rowid "
+                "WHERE entries_fts MATCH ? ORDER BY bm25(entries_fts), entries.id DESC LIMIT ?", (match, limit))
+        conditions = " AND ".join("(transcript LIKE ? OR response LIKE ?)" for _ in terms)
+        params = tuple(value for term in terms for value in (f"%{term}%", f"%{term}%"))
+        return self._query(f"SELECT {_COLUMNS} FROM entries WHERE {conditions} ORDER BY id DESC LIMIT ?",
+                           params + (limit,))
+
+    def audio(self, entry_id: int) -> Optional[tuple]:
+        """The saved (bytes, codec) of an entry's recording, if it was kept."""
+        self._ready.wait(5)
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT audio, audio_codec FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        finally:
+            conn.close()
+        return (row[0], row[1]) if row and row[0] is not None else None
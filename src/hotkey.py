@@ -0,0 +1,72 @@
+import threading
+from typing import Callable
+from src.circular_logger import logger
+from src.startup_profile import startup_profile
+
+
+class PushToTalkHotkey:
+    """Global hotkey that calls `on_press` when the combination goes down and `on_release` when it is let go.
+
+    Uses a pynput keyboard listener, so the callbacks run on the listener's
+    thread, never waiting on the menu bar. They must return quickly: macOS
+    disables slow event taps.
+    """
+
+    def __init__(self, combination: str, on_press: Callable[[], None], on_release: Callable[[], None]):
+        self.combination = combination
+        self.on_press = on_press
+        self.on_release = on_release
+        self.active = False
+        self._keys = set()
+        self._pressed = set()
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start listening; raises ValueError if the combination cannot be parsed."""
+        keyboard = startup_profile.import_module("pynput.keyboard")
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
+            # Left and right modifiers are treated alike, as pynput's own HotKey does
+            self._keys = {self._listener.canonical(key) for key in keyboard.HotKey.parse(self.combination)}
+            self._listener.daemon = True
+            self._listener.start()
+        logger.info(f"Push-to-talk hotkey {self.combination} enabled")
+
+    def stop(self):
+        with self._lock:
+            if self._listener is None:
+                return
+            self._listener.stop()
+            self._listener = None
+            self._pressed.clear()
+        if self.active:
+            self.active = False
+            self._fire(self.on_release)
+
+    def _fire(self, callback):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Push-to-talk callback failed: {str(e)}")
+
+    def _on_press(self, key):
+        listener = self._listener
+        if listener is None:
+            return
+        self._pressed.add(listener.canonical(key))
+        if not self.active and self._keys <= self._pressed:
+            self.active = True
+            self._fire(self.on_press)
+
+    def _on_release(self, key):
+        listener = self._listener
+        if listener is None:
+            return
+        key = listener.canonical(key)
+        self._pressed.discard(key)
+        if self.active and key in self._keys:
+            self.active = False
+            self._fire(self.on_release)
@@ -1,41 +1,218 @@
-from groq import Groq
-import openai
-from src.circular_logger import logger, setup_logging
+import threading
+import time
+from typing import TYPE_CHECKING, Iterator, Optional
+from src.circular_logger import logger
+from src.context_packer import estimator_for, pack_context
+from src.metrics import metrics
+from src.rate_limiter import endpoint_key, rate_limiter
+from src.retry import RetryPolicy
+from src.startup_profile import startup_profile
+
+if TYPE_CHECKING:
+    import httpx
+
+# Idle sockets are kept much longer than httpx's 5 second default, and pinged
+# more often than that, so the connection is still open when a dictation ends
+KEEPALIVE_EXPIRY = 300  # seconds
+KEEPALIVE_INTERVAL = 45  # seconds
+
+# Chat model used for each provider
+CHAT_MODELS = {
+    "groq": "llama-3.3-70b-versatile",
+    "openai": "gpt-4o-mini-2024-07-18",
+}
+
+_http_clients = {}
+_http_clients_lock = threading.Lock()
+
+def load_sdk(provider: str):
+    """Import a provider SDK on first use; they are slow to import and not needed to show the menu."""
+    if provider not in CHAT_MODELS:
+        raise ValueError("Invalid provider. Must be 'groq' or 'openai'.")
+    return startup_profile.import_module(provider)
+
+def _rate_limit_hook(provider: str):
+    """httpx response hook feeding every transcription and chat response's rate-limit headers to the limiter."""
+    def hook(response):
+        key = endpoint_key(provider, response.request.url.path)
+        if key is None:
+            return
+        body = ""
+        if response.status_code == 429:
+            # Some quotas are only named in the error body; the SDK reads the cached body afterwards
+            response.read()
+            body = response.text
+        rate_limiter.observe(key, response.headers, response.status_code, body)
+    return hook
+
+def get_http_client(provider: str) -> "httpx.Client":
+    """Return the long-lived HTTP connection pool shared by every client of a provider."""
+    with _http_clients_lock:
+        client = _http_clients.get(provider)
+        if client is None or client.is_closed:
+            sdk = load_sdk(provider)
+            httpx = startup_profile.import_module("httpx")
+            limits = httpx.Limits(max_connections=20, max_keepalive_connections=10,
+                                  keepalive_expiry=KEEPALIVE_EXPIRY)
+            client = sdk.DefaultHttpxClient(limits=limits, event_hooks={"response": [_rate_limit_hook(provider)]})
+            _http_clients[provider] = client
+        return client
 
 class LLM:
     def __init__(self, api_key: str, provider: str = "groq"):
         if provider == "groq":
             self.provider = "groq"
-            self.groq = Groq(api_key=api_key)
+            # Retries are handled by RetryPolicy, not the SDK
+            self.groq = load_sdk("groq").Groq(api_key=api_key, http_client=get_http_client("groq"), max_retries=0)
         elif provider == "openai":
             self.provider = "openai"
-            self.openai = openai.OpenAI(api_key=api_key)
+            self.openai = load_sdk("openai").OpenAI(api_key=api_key, http_client=get_http_client("openai"),
+                                                    max_retries=0)
         else:
             raise ValueError("Invalid provider. Must be 'groq' or 'openai'.")
-        setup_logging()
-
-    def generate_response(self, prompt: str, context: str) -> str:
-        logger.info(f"Generating response for prompt: {prompt} with context: {context} using provider: {self.provider}")
-
-        if self.provider == "groq":
-            response = self.groq.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant who helps the user with their tasks. Always respond concisely with only what's important \
-                     unless mentioned by the user otherwise."},
-                    {"role": "user", "content": prompt +  ("\n\nHere is a context that might be relevant to the prompt: " + context  if context else "")}
-                ]
-            )
-            return response.choices[0].message.content
-        elif self.provider == "openai":
-            response = self.openai.chat.completions.create(
-                model="gpt-4o-mini-2024-07-18",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant who helps the user with their tasks. Always respond concisely with only what's important \
-                     unless mentioned by the user otherwise."},
-                    {"role": "user", "content": prompt +  ("\n\nHere is a context that might be relevant to the prompt: " + context  if context else "")}
-                ]
-            )
-            return response.choices[0].message.content
-        else:
+        self._keepalive_stop = threading.Event()
+        self._keepalive_thread = None
+        self.retry_policy = RetryPolicy(max_attempts=3, deadline=60.0)
+
+    @property
+    def client(self):
+        """The SDK client for the configured provider."""
+        return self.groq if self.provider == "groq" else self.openai
+
+    def warm_up(self) -> bool:
+        """Open (or refresh) a pooled connection with a cheap authenticated request.
+
+        This pays DNS, TCP and TLS setup up front instead of on the first dictation.
+        """
+        try:
+            self.client.models.list()
+            logger.debug(f"Warmed up {self.provider} connection")
+            return True
+        except Exception as e:
+            logger.warning(f"Warm-up request to {self.provider} failed: {str(e)}")
+            return False
+
+    def start_keepalive(self, interval: float = KEEPALIVE_INTERVAL):
+        """Warm up in the background now, then periodically keep the pooled socket hot."""
+        if self._keepalive_thread is not None:
+            return
+
+        def keepalive():
+            self.warm_up()
+            while not self._keepalive_stop.wait(interval):
+                self.warm_up()
+
+        self._keepalive_thread = threading.Thread(target=keepalive, daemon=True)
+        self._keepalive_thread.start()
+
+    def stop_keepalive(self):
+        """Stop the background keep-alive pings."""
+        self._keepalive_stop.set()
+        self._keepalive_thread = None
+
+    def _messages(self, prompt: str, context: str, context_budget: Optional[int] = None) -> list:
+        if context and context_budget:
+            model = CHAT_MODELS[self.provider]
+            with metrics.span("context_packing", provider=self.provider, model=model) as tags:
+                packed = pack_context(prompt, context, model, context_budget)
+                tags.update(context_tokens=packed.tokens, selection_tokens=packed.original_tokens)
+            if packed.trimmed:
+                logger.info(f"Packed selected text from ~{packed.original_tokens} to ~{packed.tokens} tokens "
+                            f"for {model}")
+            context = packed.text
+        return [
+            {"role": "system", "content": "You are a helpful assistant who helps the user with their tasks. Always respond concisely with only what's important \
+             unless mentioned by the user otherwise."},
+            {"role": "user", "content": prompt +  ("\n\nHere is a context that might be relevant to the prompt: " + context  if context else "")}
+        ]
+
+    def _create_completion(self, messages: list, description: str, deadline: Optional[float] = None, **kwargs):
+        """Create a chat completion on the configured provider with retries."""
+        attempts = 0
+        # Estimated prompt size, to keep clear of a tokens-per-minute quota and to report what was sent
+        tokens = sum(estimator_for(CHAT_MODELS[self.provider]).count(message["content"]) for message in messages)
+
+        def attempt(timeout: float):
+            nonlocal attempts
+            attempts += 1
+            started = time.monotonic()
+            rate_limiter.acquire(f"{self.provider}/chat", max(0.0, timeout - self.retry_policy.min_attempt_time),
+                                 requests=1, tokens=tokens)
+            timeout -= time.monotonic() - started
+            with metrics.span("generation", provider=self.provider, model=CHAT_MODELS[self.provider],
+                              attempt=attempts, stream=bool(kwargs.get("stream")), input_tokens=tokens) as tags:
+                response = request(timeout)
+                # Streams carry no usage until their last chunk; complete responses report the exact count
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    tags["prompt_tokens"] = usage.prompt_tokens
+                logger.info(f"Sent {tags.get('prompt_tokens', f'~{tokens}')} input tokens to {self.provider}")
+                return response
+
+        def request(timeout: float):
+            if self.provider == "groq":
+                return self.groq.chat.completions.create(
+                    model=CHAT_MODELS["groq"],
+                    messages=messages,
+                    timeout=timeout,
+                    **kwargs
+                )
+            elif self.provider == "openai":
+                return self.openai.chat.completions.create(
+                    model=CHAT_MODELS["openai"],
+                    messages=messages,
+                    timeout=timeout,
+                    **kwargs
+                )
             raise ValueError("Invalid provider. Must be 'groq' or 'openai'.")
+
+        return self.retry_policy.call(attempt, description, deadline=deadline)
+
+    def generate_response(self, prompt: str, context: str, deadline: Optional[float] = None,
+                          context_budget: Optional[int] = None) -> str:
+        logger.info(f"Generating response for prompt: {prompt} with {len(context or '')} characters of context "
+                    f"using provider: {self.provider}")
+        response = self._create_completion(self._messages(prompt, context, context_budget), "Response generation",
+                                           deadline)
+        return response.choices[0].message.content
+
+    def stream_response(self, prompt: str, context: str, deadline: Optional[float] = None,
+                        context_budget: Optional[int] = None) -> Iterator[str]:
+        """Open a streaming completion and return an iterator over its text deltas.
+
+        The request (and any retries) happens before this returns, so only
+        reading the stream is left to the caller.
+        """
+        logger.info(f"Streaming response for prompt: {prompt} with {len(context or '')} characters of context "
+                    f"using provider: {self.provider}")
+        stream = self._create_completion(self._messages(prompt, context, context_budget), "Response streaming",
+                                         deadline, stream=True)
+        return ResponseStream(stream)
+
+
+class ResponseStream:
+    """Text deltas of a streamed completion.
+
+    close() releases the connection even if the stream was never read, e.g.
+    a hedged request that lost or a job cancelled before delivery.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._deltas = self._read()
+
+    def _read(self):
+        with self._stream:
+            for chunk in self._stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._deltas)
+
+    def close(self):
+        self._deltas.close()
+        self._stream.close()
@@ -0,0 +1,161 @@
+import importlib.util
+import multiprocessing
+import threading
+import time
+from typing import Optional
+from src.audio_codec import EncodedAudio, WHISPER_SAMPLE_RATE, resample_pcm
+from src.circular_logger import logger
+from src.metrics import metrics
+
+# Small English model with int8 weights: loads in a few seconds and runs faster than real time on a laptop CPU
+DEFAULT_LOCAL_MODEL = "base.en"
+
+
+class LocalWhisper:
+    """faster-whisper model kept resident in a worker process.
+
+    The model loads once in the background after `start()`; inference runs
+    in the worker, so neither the UI thread nor the GIL is held while it
+    decodes. Requests are served one at a time.
+    """
+
+    def __init__(self, model_size: str = DEFAULT_LOCAL_MODEL, compute_type: str = "int8", cpu_threads: int = 0):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.error: Optional[str] = None
+        self._process = None
+        self._conn = None
+        self._ready = threading.Event()
+        # Starting and stopping never wait for an inference, which holds the request lock throughout
+        self._lifecycle_lock = threading.Lock()
+        self._request_lock = threading.Lock()
+        self._request_id = 0
+
+    @staticmethod
+    def installed() -> bool:
+        """Whether the optional faster-whisper package is available."""
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self):
+        """Spawn the worker and load the model in the background; returns immediately."""
+        with self._lifecycle_lock:
+            if self._process is not None and self._process.is_alive():
+                return
+            if not self.installed():
+                self.error = "faster-whisper is not installed"
+                logger.warning(f"Local transcription unavailable: {self.error}")
+                return
+            self.error = None
+            self._ready.clear()
+            # spawn, not fork: forking a process with AppKit and live threads is unsafe on macOS
+            context = multiprocessing.get_context("spawn")
+            self._conn, child_conn = context.Pipe()
+            from src.local_whisper_worker import serve
+            self._process = context.Process(
+                target=serve, args=(child_conn, self.model_size, self.compute_type, self.cpu_threads),
+                name="whishpy-local-whisper", daemon=True)
+            self._process.start()
+            child_conn.close()
+            conn = self._conn
+        threading.Thread(target=self._await_ready, args=(conn,), daemon=True).start()
+
+    def wait_until_ready(self, timeout: float) -> bool:
+        """Block until the model has loaded (True), or failed to load or `timeout` passed (False)."""
+        give_up_at = time.monotonic() + timeout
+        while not self._ready.wait(0.1):
+            if self.error or time.monotonic() >= give_up_at:
+                return False
+        return True
+
+    def _await_ready(self, conn):
+        started = time.perf_counter()
+        try:
+            status, _, detail = conn.recv()
+        except (EOFError, OSError) as e:
+            status, detail = "error", f"worker exited during load ({str(e) or type(e).__name__})"
+        if status == "ready":
+            metrics.record("local_model_load", time.perf_counter() - started, model=self.model_size)
+            logger.info(f"Local model {self.model_size} loaded in {time.perf_counter() - started:.1f}s")
+            self._ready.set()
+        else:
+            self.error = detail
+            logger.error(f"Failed to load local model {self.model_size}: {detail}")
+
+    def stop(self):
+        """Shut the worker down and release the model.
+
+        A worker in the middle of a transcription is terminated rather than
+        waited for; that request fails.
+        """
+        with self._lifecycle_lock:
+            self._ready.clear()
+            process, conn = self._process, self._conn
+            if process is None:
+                return
+            self._process = None
+            self._conn = None
+            busy = self._request_lock.locked()
+            if not busy:
+                try:
+                    conn.send(None)
+                except (OSError, ValueError):
+                    pass
+                process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+            # A transcription in progress sees the worker exit and gives up its own handle on the pipe
+            if not busy:
+                conn.close()
+
+    def transcribe(self, audio: EncodedAudio, timeout: float, language: str = "en",
+                   prompt: Optional[str] = None) -> str:
+        """Transcribe on the resident model, raising if it is not loaded or takes longer than `timeout`.
+
+        `prompt` primes the model with vocabulary, as the providers' prompt parameter does.
+        """
+        if not self.ready:
+            raise RuntimeError(self.error or "Local model is still loading")
+        if audio.pcm is not None:
+            # Resampling and downmixing here keeps the worker's input format fixed
+            samples = resample_pcm(audio.pcm, audio.sample_rate, WHISPER_SAMPLE_RATE, audio.channels)
+            mono = samples[:, 0] if audio.channels == 1 else samples.mean(axis=1).astype(samples.dtype)
+            kind, payload = "pcm", mono.tobytes()
+        else:
+            kind, payload = "file", bytes(audio.data)
+
+        with self._request_lock:
+            conn = self._conn
+            if conn is None or not self.ready:
+                raise RuntimeError(self.error or "Local model is not running")
+            self._request_id += 1
+            request_id = self._request_id
+            give_up_at = time.monotonic() + timeout
+            try:
+                conn.send((request_id, kind, payload, language, prompt))
+                while True:
+                    remaining = give_up_at - time.monotonic()
+                    if remaining <= 0 or not conn.poll(remaining):
+                        raise TimeoutError(f"Local transcription took longer than {timeout:.1f}s")
+                    status, response_id, text = conn.recv()
+                    # Results of requests that timed out earlier arrive late; skip them
+                    if response_id == request_id:
+                        break
+            except TimeoutError:
+                raise
+            except (EOFError, OSError) as e:
+                if conn is not self._conn:
+                    # stop() terminated the worker while it was busy with this request
+                    conn.close()
+                    raise RuntimeError("Local model was stopped") from e
+                self._ready.clear()
+                self.error = "Local transcription worker exited"
+                logger.error(f"{self.error}: {str(e)}")
+                raise RuntimeError(self.error) from e
+        if status != "result":
+            raise RuntimeError(f"Local transcription failed: {text}")
+        return text
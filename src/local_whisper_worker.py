@@ -0,0 +1,46 @@
+"""Entry point of the local transcription worker process.
+
+Kept free of other src imports so the spawned process starts quickly and
+does not open its own log file. The spawn start method also imports
+main.py again, as __mp_main__, which only runs its standard-library
+imports; the app itself is imported inside main(). Messages on the pipe are tuples:
+
+    parent -> worker: (request_id, kind, payload, language, prompt), or None to exit
+    worker -> parent: ("ready" | "result" | "error", request_id, text)
+"""
+
+import io
+
+
+def serve(conn, model_size: str, compute_type: str, cpu_threads: int):
+    """Load the model once, then answer transcription requests until the pipe closes."""
+    try:
+        import numpy as np
+        from faster_whisper import WhisperModel
+        model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+        # The first inference initialises the runtime; pay that here instead of on the first dictation
+        list(model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)[0])
+    except Exception as e:
+        conn.send(("error", None, f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", None, model_size))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        request_id, kind, payload, language, prompt = message
+        try:
+            if kind == "pcm":
+                # 16 kHz mono int16, as prepared by the parent
+                audio = np.frombuffer(payload, dtype=np.int16).astype(np.float32) / 32768.0
+            else:
+                audio = io.BytesIO(payload)
+            segments, _ = model.transcribe(audio, language=language, beam_size=1, initial_prompt=prompt or None,
+                                           condition_on_previous_text=False)
+            conn.send(("result", request_id, "".join(segment.text for segment in segments).strip()))
+        except Exception as e:
+            conn.send(("error", request_id, f"{type(e).__name__}: {e}"))
@@ -0,0 +1,385 @@
+"""Segmented JSON-lines log files with a small index per segment.
+
+Each segment is a file of lines like {"ts": 1718000000.123, "level": "INFO", "msg": "..."}.
+When a segment is full it is sealed: a sidecar .idx file records its time
+range, entry counts per level and sparse (timestamp, offset) checkpoints,
+so queries open only the segments, and the part of each, that can match.
+
+    python main.py logs --level warning --since 2h --grep Transcription
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx"
+
+
+class LogRecord:
+    """One log entry read back from a segment."""
+
+    def __init__(self, ts: float, level: str, msg: str):
+        self.ts = ts
+        self.level = level
+        self.msg = msg
+
+    def __repr__(self):
+        return f"<LogRecord {self.ts} {self.level} {self.msg[:40]!r}>"
+
+    def format(self) -> str:
+        """The classic `[timestamp] [LEVEL] message` line."""
+        return f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.ts))}] [{self.level}] {self.msg}"
+
+
+class SegmentIndex:
+    """Time range, per-level counts and sparse offsets of one segment.
+
+    Each checkpoint is (latest timestamp before offset, offset). Timestamps
+    are taken as a running maximum, so the checkpoints stay sorted even if
+    the clock steps back, and a query for entries since T can start at the
+    last checkpoint whose preceding entries are all older than T.
+    """
+
+    def __init__(self, first_ts: Optional[float] = None, last_ts: Optional[float] = None,
+                 levels: Optional[Dict[str, int]] = None, checkpoints: Optional[List[List[float]]] = None,
+                 size: int = 0):
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+        self.levels = levels or {}
+        self.checkpoints = checkpoints or []
+        self.size = size
+
+    def add(self, ts: float, level: str, length: int, checkpoint_every: int):
+        self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        self.levels[level] = self.levels.get(level, 0) + 1
+        crossed = self.size // checkpoint_every != (self.size + length) // checkpoint_every
+        self.size += length
+        if crossed:
+            # The next line starts here, after everything up to last_ts
+            self.checkpoints.append([self.last_ts, self.size])
+
+    def copy(self) -> "SegmentIndex":
+        return SegmentIndex(self.first_ts, self.last_ts, dict(self.levels), list(self.checkpoints), self.size)
+
+    def may_match(self, min_level: int, since: Optional[float], until: Optional[float]) -> bool:
+        if not self.size:
+            return False
+        if since is not None and self.last_ts < since:
+            return False
+        if until is not None and self.first_ts > until:
+            return False
+        return any(LEVELS.get(level, 0) >= min_level for level in self.levels)
+
+    def start_offset(self, since: Optional[float]) -> int:
+        if since is None or not self.checkpoints:
+            return 0
+        position = bisect.bisect_left([checkpoint[0] for checkpoint in self.checkpoints], since)
+        return int(self.checkpoints[position - 1][1]) if position else 0
+
+    def to_json(self) -> str:
+        return json.dumps({"first_ts": self.first_ts, "last_ts": self.last_ts, "levels": self.levels,
+                           "checkpoints": self.checkpoints, "size": self.size})
+
+    @classmethod
+    def from_json(cls, text: str) -> "SegmentIndex":
+        data = json.loads(text)
+        return cls(data["first_ts"], data["last_ts"], data["levels"], data["checkpoints"], data["size"])
+
+
+def _parse(line: bytes) -> Optional[LogRecord]:
+    try:
+        entry = json.loads(line)
+        return LogRecord(entry["ts"], entry["level"], entry["msg"])
+    except (ValueError, KeyError, TypeError):
+        # A torn last line after a crash
+        return None
+
+
+class LogStore:
+    """Directory of log segments with bounded total size.
+
+    `write()` is called by a single writer thread; `query()` may be called
+    from any thread, or another process reading the same directory.
+    """
+
+    def __init__(self, directory, segment_size: int = 1024 * 1024, retention: int = 16 * 1024 * 1024,
+                 checkpoint_every: int = 64 * 1024):
+        self.directory = Path(directory)
+        self.segment_size = segment_size
+        self.retention = retention
+        self.checkpoint_every = checkpoint_every
+        self._file = None
+        self._active_path: Optional[Path] = None
+        self._active_index: Optional[SegmentIndex] = None
+        # Indexes of sealed segments, which never change once written
+        self._indexes: Dict[Path, SegmentIndex] = {}
+        self._orphans_checked = False
+        self._lock = threading.Lock()
+
+    def segment_paths(self) -> List[Path]:
+        """Every segment in the directory, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [self.directory / name for name in sorted(names) if name.endswith(SEGMENT_SUFFIX)]
+
+    def _index_path(self, path: Path) -> Path:
+        return path.with_suffix(INDEX_SUFFIX)
+
+    def _open_segment(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Names sort by creation time; the nanosecond part keeps them unique
+        path = self.directory / f"{time.time_ns():020d}{SEGMENT_SUFFIX}"
+        self._file = open(path, 'ab')
+        with self._lock:
+            self._active_path = path
+            self._active_index = SegmentIndex()
+        if not self._orphans_checked:
+            self._orphans_checked = True
+            self._index_orphans()
+        # Earlier sessions usually end mid-segment, without the seal that would have trimmed them
+        self._enforce_retention()
+
+    def write(self, entries: Iterable[Tuple[float, str, bytes]]):
+        """Append encoded (timestamp, level, line) entries, sealing the segment once it is full."""
+        if self._file is None:
+            self._open_segment()
+        lines = []
+        index = self._active_index.copy()
+        for ts, level, line in entries:
+            lines.append(line)
+            index.add(ts, level, len(line), self.checkpoint_every)
+        self._file.write(b''.join(lines))
+        self._file.flush()
+        # Readers only see entries once they are flushed
+        with self._lock:
+            self._active_index = index
+        if index.size >= self.segment_size:
+            self.seal()
+
+    def seal(self):
+        """Close the active segment, write its index and enforce retention."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        with self._lock:
+            path, index = self._active_path, self._active_index
+            self._active_path = self._active_index = None
+        if index.size:
+            self._write_index(path, index)
+        else:
+            os.remove(path)
+        self._enforce_retention()
+
+    def reset(self):
+        """Drop the active segment after a write error; the next write starts a new one."""
+        try:
+            if self._file is not None:
+                self._file.close()
+        except OSError:
+            pass
+        self._file = None
+        with self._lock:
+            self._active_path = self._active_index = None
+
+    def _write_index(self, path: Path, index: SegmentIndex):
+        temporary = path.with_suffix(INDEX_SUFFIX + ".tmp")
+        with open(temporary, 'w') as f:
+            f.write(index.to_json())
+        os.replace(temporary, self._index_path(path))
+        with self._lock:
+            self._indexes[path] = index
+
+    def _index_orphans(self):
+        """Index segments left unsealed by a crash, so later queries need not scan them."""
+        for path in self.segment_paths():
+            if path != self._active_path and not self._index_path(path).exists():
+                index = self._scan_index(path)
+                if index.size:
+                    self._write_index(path, index)
+
+    def _enforce_retention(self):
+        segments = [(path, path.stat().st_size) for path in self.segment_paths() if path.exists()]
+        total = sum(size for _, size in segments)
+        for path, size in segments:
+            if total <= self.retention or path == self._active_path:
+                break
+            for victim in (path, self._index_path(path)):
+                try:
+                    os.remove(victim)
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self._indexes.pop(path, None)
+            total -= size
+
+    def _scan_index(self, path: Path, size: Optional[int] = None) -> SegmentIndex:
+        index = SegmentIndex()
+        with open(path, 'rb') as f:
+            for line in f:
+                if size is not None and index.size + len(line) > size:
+                    break
+                record = _parse(line)
+                if record is None:
+                    index.size += len(line)
+                    continue
+                index.add(record.ts, record.level, len(line), self.checkpoint_every)
+        return index
+
+    def _index_for(self, path: Path) -> Optional[SegmentIndex]:
+        with self._lock:
+            if path == self._active_path:
+                return self._active_index.copy()
+            if path in self._indexes:
+                return self._indexes[path]
+        try:
+            index = SegmentIndex.from_json(self._index_path(path).read_text())
+        except FileNotFoundError:
+            # Still being written by another process, or never sealed; only whole lines are read
+            return self._scan_index(path)
+        except (ValueError, KeyError):
+            return self._scan_index(path)
+        with self._lock:
+            self._indexes[path] = index
+        return index
+
+    def query(self, level: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+              contains: Optional[str] = None, limit: Optional[int] = None) -> List[LogRecord]:
+        """Entries at or above `level`, between `since` and `until`, whose message contains `contains`.
+
+        Segments are read newest first and memory-mapped; with a `limit`,
+        reading stops once that many of the most recent matches are found.
+        Results are oldest first.
+        """
+        min_level = LEVELS.get(level.upper(), 0) if level else 0
+        # Messages are stored JSON-escaped, so the needle is escaped the same way to search the raw bytes
+        needle = json.dumps(contains)[1:-1].encode('utf-8') if contains else None
+        results: List[List[LogRecord]] = []
+        found = 0
+        for path in reversed(self.segment_paths()):
+            try:
+                index = self._index_for(path)
+            except FileNotFoundError:
+                # Removed by retention while we were listing
+                continue
+            if index is None or not index.may_match(min_level, since, until):
+                continue
+            if needle is not None:
+                needles = [needle]
+            elif min_level and any(LEVELS.get(name, 0) < min_level for name in index.levels):
+                # Only some entries qualify, so jump between them like a substring search
+                needles = [f'"level": "{name}"'.encode('utf-8') for name in index.levels
+                           if LEVELS.get(name, 0) >= min_level]
+            else:
+                needles = None
+            matches = [
+                record for record in self._read(path, index, needles, since)
+                if LEVELS.get(record.level, 0) >= min_level
+                and (since is None or record.ts >= since) and (until is None or record.ts <= until)
+                and (contains is None or contains in record.msg)
+            ]
+            results.append(matches)
+            found += len(matches)
+            if limit is not None and found >= limit:
+                break
+        records = [record for matches in reversed(results) for record in matches]
+        return records[-limit:] if limit else records
+
+    def _read(self, path: Path, index: SegmentIndex, needles: Optional[List[bytes]], since: Optional[float]):
+        """Parse the lines of a segment that may match, up to the indexed size.
+
+        With `needles`, only lines containing one of them are parsed; the
+        rest of the segment is skipped by searching the mapped bytes.
+        """
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with f, mmap.mmap(f.fileno(), index.size, access=mmap.ACCESS_READ) as mm:
+            start = index.start_offset(since)
+            if needles is None:
+                line_starts = None
+            else:
+                line_starts = set()
+                for needle in needles:
+                    hit = mm.find(needle, start, index.size)
+                    while hit >= 0:
+                        line_starts.add(mm.rfind(b'\n', 0, hit) + 1)
+                        end = mm.find(b'\n', hit, index.size)
+                        hit = mm.find(needle, end, index.size) if end >= 0 else -1
+                line_starts = sorted(line_starts)
+
+            position = start
+            for line_start in line_starts if line_starts is not None else [start]:
+                position = max(position, line_start)
+                # Without needles, read on line by line from the start offset
+                while position < index.size:
+                    end = mm.find(b'\n', position, index.size)
+                    end = index.size if end < 0 else end + 1
+                    record = _parse(mm[position:end])
+                    if record is not None:
+                        yield record
+                    position = end
+                    if line_starts is not None:
+                        break
+
+    def close(self):
+        self.seal()
+
+
+def _parse_time(value: str, now: float) -> float:
+    """An ISO date/time, or a duration ago such as '2h' or '15m'."""
+    from datetime import datetime
+    from src.rate_limiter import parse_duration
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        pass
+    seconds = parse_duration(value)
+    if seconds is None:
+        raise argparse.ArgumentTypeError(f"not a time or duration: {value}")
+    return now - seconds
+
+
+def main(argv=None) -> int:
+    from src.circular_logger import default_log_dir
+    parser = argparse.ArgumentParser(prog="main.py logs", description="Search the application logs")
+    parser.add_argument("--level", choices=[level.lower() for level in LEVELS], help="minimum level")
+    parser.add_argument("--since", help="ISO time, or how long ago, e.g. 2h or 30m")
+    parser.add_argument("--until", help="ISO time, or how long ago")
+    parser.add_argument("--grep", help="only entries whose message contains this text")
+    parser.add_argument("--limit", type=int, default=200, help="most recent matches to show (0 for all)")
+    parser.add_argument("--dir", default=str(default_log_dir()), help="log directory")
+    parser.add_argument("--json", action="store_true", help="print JSON lines instead of text")
+    args = parser.parse_args(argv)
+
+    now = time.time()
+    try:
+        since = _parse_time(args.since, now) if args.since else None
+        until = _parse_time(args.until, now) if args.until else None
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    store = LogStore(args.dir)
+    for record in store.query(args.level, since, until, args.grep, args.limit or None):
+        if args.json:
+            print(json.dumps({"ts": record.ts, "level": record.level, "msg": record.msg}, ensure_ascii=False))
+        else:
+            print(record.format())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Queue
+from typing import Dict, Optional
+from src.circular_logger import logger
+
+
+class Histogram:
+    """Rolling window of durations with percentile queries."""
+
+    def __init__(self, window: int = 200):
+        self.values = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, value: float):
+        self.values.append(value)
+        self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.values:
+            return None
+        ordered = sorted(self.values)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class Metrics:
+    """Timing spans for each pipeline stage, aggregated into rolling p50/p95/p99.
+
+    Every span is also appended as one JSON line to `export_path` by a
+    background thread, so recording a span never touches disk.
+    """
+
+    def __init__(self, export_path=None, window: int = 200, max_export_size: int = 5 * 1024 * 1024):
+        self.export_path = export_path or Path.home() / '.whishpy' / 'metrics.jsonl'
+        self.window = window
+        self.max_export_size = max_export_size
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._export_queue = Queue()
+        self._writer_thread = threading.Thread(target=self._writer, daemon=True)
+        self._writer_thread.start()
+
+    def record(self, stage: str, seconds: float, **tags):
+        """Record one completed stage."""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.window)
+            histogram.add(seconds)
+        self._export_queue.put({"ts": round(time.time(), 3), "stage": stage,
+                                "ms": round(seconds * 1000, 2), **tags})
+
+    @contextmanager
+    def span(self, stage: str, **tags):
+        """Time the enclosed block. Tags can be added to the yielded dict while it runs."""
+        started = time.perf_counter()
+        span_tags = dict(tags)
+        try:
+            yield span_tags
+        except Exception as e:
+            span_tags["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - started, **span_tags)
+
+    def summary(self) -> Dict[str, dict]:
+        """Count and p50/p95/p99 in milliseconds for each stage."""
+        with self._lock:
+            return {
+                stage: {
+                    "count": histogram.count,
+                    **{f"p{pct}": round(histogram.percentile(pct) * 1000, 1) for pct in (50, 95, 99)},
+                }
+                for stage, histogram in self._histograms.items()
+            }
+
+    def report(self) -> str:
+        """Human-readable summary, one stage per line."""
+        lines = [
+            f"{stage}: p50 {stats['p50']} ms, p95 {stats['p95']} ms, p99 {stats['p99']} ms (n={stats['count']})"
+            for stage, stats in sorted(self.summary().items())
+        ]
+        return "\n".join(lines) or "No timings recorded yet"
+
+    def _open_export(self):
+        Path(self.export_path).parent.mkdir(parents=True, exist_ok=True)
+        f = open(self.export_path, 'ab')
+        return f, os.fstat(f.fileno()).st_size
+
+    def _writer(self):
+        """Background thread that appends spans to the JSON lines export through one open handle"""
+        f, size = None, 0
+        while True:
+            entries = [self._export_queue.get()]
+            while not self._export_queue.empty():
+                entries.append(self._export_queue.get_nowait())
+            try:
+                if f is None:
+                    f, size = self._open_export()
+                if size > self.max_export_size:
+                    f.close()
+                    f = None
+                    os.replace(self.export_path, f"{self.export_path}.1")
+                    f, size = self._open_export()
+                data = "".join(json.dumps(entry) + "\n" for entry in entries).encode()
+                f.write(data)
+                f.flush()
+                size += len(data)
+            except Exception as e:
+                logger.error(f"Error exporting metrics: {str(e)}")
+                # Reopen on the next batch, in case the file was moved or the disk recovered
+                if f is not None:
+                    f.close()
+                    f = None
+
+
+# Create a global metrics instance
+metrics = Metrics()
@@ -0,0 +1,166 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, List, Optional
+from src.circular_logger import logger
+
+
+class Job:
+    """A unit of work submitted to the PipelineExecutor, with its state and timings."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, seq: int, name: str, work: Callable[["Job"], Any],
+                 deliver: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 on_finish: Optional[Callable[["Job"], None]] = None):
+        self.seq = seq
+        self.name = name
+        self.work = work
+        self.deliver = deliver
+        self.on_error = on_error
+        self.on_finish = on_finish
+        self.state = Job.QUEUED
+        self.result = None
+        self.error = None
+        # Anything the work wants to hand to on_finish, e.g. the transcript behind a streamed result
+        self.details = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancelled = threading.Event()
+
+    def __repr__(self):
+        return f"<Job {self.seq} {self.name} {self.state}>"
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Request cancellation. Queued jobs never run; running jobs have their result discarded."""
+        self._cancelled.set()
+
+
+class PipelineExecutor:
+    """Bounded worker pool that runs jobs concurrently but delivers their results in submission order.
+
+    `work` runs on a worker thread and returns a result; `deliver` (or
+    `on_error`) is then called strictly in submission order, so text from
+    an earlier dictation is always inserted before text from a later one.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 4):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._deliver_lock = threading.Lock()
+        self._next_seq = 0
+        self._next_delivery = 0
+        self._finished = {}
+        self._active: List[Job] = []
+        self.history = deque(maxlen=20)
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"pipeline-{i}", daemon=True).start()
+
+    def submit(self, name: str, work: Callable[[Job], Any], deliver=None, on_error=None, on_finish=None) -> Optional[Job]:
+        """Queue a job, or return None when the queue is full."""
+        with self._lock:
+            job = Job(self._next_seq, name, work, deliver, on_error, on_finish)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                logger.warning(f"Pipeline queue full, rejecting {name}")
+                return None
+            self._next_seq += 1
+            self._active.append(job)
+        logger.info(f"Queued {job}")
+        return job
+
+    @property
+    def full(self) -> bool:
+        """Whether `submit()` would reject a job right now."""
+        return self._queue.full()
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs that have not been delivered yet."""
+        with self._lock:
+            return len(self._active)
+
+    def active_jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._active)
+
+    def cancel_all(self):
+        """Cancel every job that has not been delivered yet."""
+        for job in self.active_jobs():
+            job.cancel()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            except Exception as e:
+                logger.error(f"Pipeline worker error on {job}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job):
+        if not job.cancelled:
+            job.state = Job.RUNNING
+            job.started_at = time.time()
+            try:
+                job.result = job.work(job)
+                job.state = Job.DONE
+            except Exception as e:
+                job.error = e
+                job.state = Job.FAILED
+        if job.cancelled:
+            job.state = Job.CANCELLED
+        job.finished_at = time.time()
+        logger.info(f"{job} finished in {job.finished_at - job.created_at:.2f}s")
+
+        with self._lock:
+            self._finished[job.seq] = job
+        self._deliver_ready()
+
+    def _deliver_ready(self):
+        """Deliver finished jobs whose predecessors have all been delivered."""
+        with self._deliver_lock:
+            while True:
+                with self._lock:
+                    job = self._finished.pop(self._next_delivery, None)
+                    if job is None:
+                        return
+                    self._next_delivery += 1
+                self._deliver(job)
+
+    def _deliver(self, job: Job):
+        # Cancelled while waiting for an earlier job to be delivered
+        if job.cancelled:
+            job.state = Job.CANCELLED
+        try:
+            if job.state == Job.DONE and job.deliver:
+                job.deliver(job.result)
+            elif job.state == Job.FAILED and job.on_error:
+                job.on_error(job.error)
+        except Exception as e:
+            logger.error(f"Error delivering {job}: {str(e)}")
+            if job.on_error:
+                job.on_error(e)
+        finally:
+            with self._lock:
+                if job in self._active:
+                    self._active.remove(job)
+                self.history.append(job)
+            if job.on_finish:
+                try:
+                    job.on_finish(job)
+                except Exception as e:
+                    logger.error(f"Error finishing {job}: {str(e)}")
@@ -0,0 +1,195 @@
+import re
+import threading
+import time
+from typing import Dict, Optional
+from src.circular_logger import logger
+
+# Quota codes in provider 429 messages, e.g. "on seconds of audio per hour (ASH): Limit 7200, Used 7185"
+_QUOTA_CODES = {
+    "RPM": ("requests", 60),
+    "RPD": ("requests_day", 86400),
+    "TPM": ("tokens", 60),
+    "TPD": ("tokens_day", 86400),
+    "ASH": ("audio_seconds", 3600),
+    "ASD": ("audio_seconds_day", 86400),
+}
+_QUOTA_MESSAGE = re.compile(r"\(([A-Z]{3})\):\s*Limit\s+([\d.]+),\s*Used\s+([\d.]+)")
+_DURATION_PART = re.compile(r"([\d.]+)(ms|h|m|s)")
+
+# Default refill period of header-reported limits when the reset time does not tell us better
+_DEFAULT_PERIOD = 60.0
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Seconds in a rate-limit reset value such as '7.66s', '2m59.56s' or '120ms'."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+class RateLimitExceeded(Exception):
+    """Raised instead of sending a request that the quota cannot cover in time."""
+
+    def __init__(self, key: str, bucket: str, wait: float):
+        self.key = key
+        self.bucket = bucket
+        self.wait = wait
+        super().__init__(f"{key} {bucket.replace('_', ' ')} quota exhausted for another {wait:.1f}s")
+
+
+class TokenBucket:
+    """Continuously refilling budget of `capacity` units per `period` seconds."""
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (requests larger than capacity wait for a full bucket)."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+    def sync(self, capacity: float, remaining: float, reset: Optional[float], now: float):
+        """Adopt the provider's view of the quota; the refill rate is inferred from the reset time."""
+        self.capacity = capacity
+        if reset and capacity > remaining:
+            self.period = max(1.0, reset * capacity / (capacity - remaining))
+        self.tokens = min(capacity, remaining)
+        self.updated = now
+
+
+class RateLimiter:
+    """Client-side token buckets per provider endpoint, learned from rate-limit headers and 429s.
+
+    Callers `acquire()` a cost (requests, tokens, audio seconds) before
+    sending. If a bucket cannot cover it within the caller's timeout,
+    RateLimitExceeded is raised instead of sending a request that would
+    only come back as a 429. Buckets with no known limit never block.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, timeout: float, **costs: float):
+        """Wait until every bucket of `key` covers its cost, then consume it."""
+        give_up_at = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                buckets = self._buckets.get(key, {})
+                waits = {"retry_after": self._blocked_until.get(key, 0.0) - now}
+                for name, amount in costs.items():
+                    if name in buckets and amount:
+                        waits[name] = buckets[name].wait_time(amount, now)
+                bucket, wait = max(waits.items(), key=lambda item: item[1])
+                if wait <= 0:
+                    for name, amount in costs.items():
+                        if name in buckets and amount:
+                            buckets[name].consume(amount, now)
+                    return
+            if now + wait > give_up_at:
+                raise RateLimitExceeded(key, bucket, wait)
+            logger.info(f"Delaying {key} request {wait:.2f}s for {bucket.replace('_', ' ')} quota")
+            time.sleep(wait)
+
+    def _bucket(self, key: str, name: str, capacity: float, period: float) -> TokenBucket:
+        buckets = self._buckets.setdefault(key, {})
+        if name not in buckets:
+            buckets[name] = TokenBucket(capacity, period)
+        return buckets[name]
+
+    def observe(self, key: str, headers, status: int = 200, body: str = ""):
+        """Learn limits from a response's x-ratelimit-* headers, and back off after a 429."""
+        now = time.monotonic()
+        with self._lock:
+            for name in ("requests", "tokens"):
+                limit = headers.get(f"x-ratelimit-limit-{name}")
+                remaining = headers.get(f"x-ratelimit-remaining-{name}")
+                if limit is None or remaining is None:
+                    continue
+                try:
+                    limit, remaining = float(limit), float(remaining)
+                except ValueError:
+                    continue
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{name}", ""))
+                self._bucket(key, name, limit, _DEFAULT_PERIOD).sync(limit, remaining, reset, now)
+
+            if status != 429:
+                return
+            # Quotas without headers (e.g. audio seconds per hour) are only named in the error message
+            for code, limit, used in _QUOTA_MESSAGE.findall(body or ""):
+                if code in _QUOTA_CODES:
+                    name, period = _QUOTA_CODES[code]
+                    limit, used = float(limit), float(used)
+                    self._bucket(key, name, limit, period).sync(limit, limit - used, None, now)
+            wait = parse_duration(headers.get("retry-after", "")) or 1.0
+            self._blocked_until[key] = max(self._blocked_until.get(key, 0.0), now + wait)
+        logger.warning(f"{key} rate limited, holding requests for {wait:.1f}s")
+
+    def headroom(self, key: str) -> Dict[str, dict]:
+        """Remaining and total units of each known bucket, plus any 429 hold, for one endpoint."""
+        with self._lock:
+            now = time.monotonic()
+            result = {
+                name: {"remaining": round(bucket.available(now), 1), "limit": bucket.capacity,
+                       "full_in": round((bucket.capacity - bucket.tokens) / bucket.rate, 1)}
+                for name, bucket in self._buckets.get(key, {}).items()
+            }
+            blocked = self._blocked_until.get(key, 0.0) - now
+            if blocked > 0:
+                result["retry_after"] = {"remaining": 0, "limit": None, "full_in": round(blocked, 1)}
+            return result
+
+    def summary(self) -> str:
+        """Human-readable headroom of every endpoint seen so far."""
+        with self._lock:
+            keys = sorted(self._buckets.keys() | self._blocked_until.keys())
+        lines = []
+        for key in keys:
+            for name, room in self.headroom(key).items():
+                limit = f"/{room['limit']:g}" if room["limit"] is not None else ""
+                lines.append(f"{key} {name.replace('_', ' ')}: {room['remaining']:g}{limit} left, "
+                             f"full in {room['full_in']:g}s")
+        return "\n".join(lines) or "No rate limits seen yet"
+
+
+def endpoint_key(provider: str, path: str) -> Optional[str]:
+    """Limiter key of an API path: transcriptions and chat completions have separate quotas."""
+    if path.endswith("/audio/transcriptions"):
+        return f"{provider}/transcription"
+    if path.endswith("/chat/completions"):
+        return f"{provider}/chat"
+    return None
+
+
+# Create a global rate limiter shared by transcription and generation
+rate_limiter = RateLimiter()
@@ -0,0 +1,117 @@
+import random
+import sys
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, TypeVar
+from src.circular_logger import logger
+
+T = TypeVar("T")
+
+# Statuses worth another attempt; everything else (400, 401, 403, 404, 413, 422, ...) fails fast
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+def _connection_errors() -> tuple:
+    """Connection error types of whichever SDKs are loaded; they are imported lazily elsewhere."""
+    errors = [ConnectionError, TimeoutError]
+    for module, name in (("groq", "APIConnectionError"), ("openai", "APIConnectionError"),
+                         ("httpx", "TransportError")):
+        if module in sys.modules:
+            errors.append(getattr(sys.modules[module], name))
+    return tuple(errors)
+
+
+class RetryError(Exception):
+    """Raised when a call gives up, carrying the last underlying error."""
+
+    def __init__(self, description: str, attempts: int, last_error: Exception):
+        self.attempts = attempts
+        self.last_error = last_error
+        plural = "attempt" if attempts == 1 else "attempts"
+        super().__init__(f"{description} failed after {attempts} {plural}: {str(last_error)}")
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a provider SDK error, if it has one."""
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Classify an error as transient (retry) or permanent (fail fast)."""
+    if isinstance(error, _connection_errors()):
+        return True
+    status = status_code(error)
+    return status is not None and (status in RETRYABLE_STATUS or status >= 500)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, from Retry-After / retry-after-ms headers."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter inside an end-to-end latency budget.
+
+    `call` passes the remaining budget to the wrapped function so it can be
+    used as the per-attempt timeout; once the budget cannot cover another
+    wait plus attempt, the last error is raised instead of sleeping.
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: float = 30.0, min_attempt_time: float = 1.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.min_attempt_time = min_attempt_time
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Delay before the next attempt, never shorter than the server's Retry-After."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        requested = retry_after(error)
+        if requested is not None:
+            delay = max(delay, requested)
+        return delay
+
+    def call(self, fn: Callable[[float], T], description: str = "Request", deadline: Optional[float] = None) -> T:
+        """Call `fn(timeout)` until it succeeds, fails permanently, or the budget runs out."""
+        budget = deadline if deadline is not None else self.deadline
+        give_up_at = time.monotonic() + budget
+        attempt = 0
+        while True:
+            remaining = give_up_at - time.monotonic()
+            try:
+                return fn(remaining)
+            except Exception as e:
+                attempt += 1
+                if not is_retryable(e):
+                    logger.warning(f"{description} failed with a permanent error: {str(e)}")
+                    raise RetryError(description, attempt, e) from e
+                if attempt >= self.max_attempts:
+                    raise RetryError(description, attempt, e) from e
+
+                delay = self.backoff(attempt - 1, e)
+                remaining = give_up_at - time.monotonic()
+                if delay + self.min_attempt_time > remaining:
+                    logger.warning(f"{description} out of latency budget after {attempt} attempts")
+                    raise RetryError(description, attempt, e) from e
+                logger.warning(f"{description} attempt {attempt} failed ({str(e)}), retrying in {delay:.2f}s")
+                time.sleep(delay)
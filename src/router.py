@@ -0,0 +1,207 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+from src.circular_logger import logger
+
+T = TypeVar("T")
+
+# A candidate is a "provider/model" key plus the call that runs the request there
+Candidate = Tuple[str, Callable[[], T]]
+
+
+class RouteStats:
+    """Rolling latency samples and recent failures for one provider/model."""
+
+    def __init__(self, window: int = 50, error_window: float = 120.0):
+        self.latencies = deque(maxlen=window)
+        self.errors = deque(maxlen=window)
+        self.error_window = error_window
+        self.successes = 0
+
+    def record(self, latency: float, ok: bool):
+        if ok:
+            self.latencies.append(latency)
+            self.successes += 1
+        else:
+            self.errors.append(time.monotonic())
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def recent_errors(self) -> int:
+        cutoff = time.monotonic() - self.error_window
+        return sum(1 for t in self.errors if t >= cutoff)
+
+    @property
+    def error_rate(self) -> float:
+        errors = self.recent_errors()
+        total = errors + min(self.successes, len(self.latencies))
+        return errors / total if total else 0.0
+
+    @property
+    def healthy(self) -> bool:
+        """Unhealthy after repeated recent failures; errors age out, so it is retried later."""
+        return self.recent_errors() < 2 or self.error_rate < 0.5
+
+
+def _close_result(future):
+    """Release what a discarded hedged request returned, e.g. an open response stream."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    close = getattr(future.result(), "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception as e:
+            logger.warning(f"Closing a discarded hedged result failed: {str(e)}")
+
+
+class ProviderRouter:
+    """Sends each request to the fastest healthy provider, failing over or hedging to the next.
+
+    Routes are ranked by rolling p50 latency; a route with fewer than
+    `min_samples` latencies ranks ahead of the measured ones, so every
+    route is measured before the ranking settles. With hedging on, a duplicate
+    request is fired at the runner-up once the first has been outstanding
+    longer than its own p95, and whichever answers first wins.
+    """
+
+    def __init__(self, preferred: Optional[str] = None, hedge: bool = False,
+                 default_hedge_delay: float = 2.0, min_samples: int = 5):
+        self.preferred = preferred
+        self.hedge = hedge
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="router")
+
+    def stats(self, key: str) -> RouteStats:
+        with self._lock:
+            if key not in self._stats:
+                self._stats[key] = RouteStats()
+            return self._stats[key]
+
+    def record(self, key: str, latency: float, ok: bool):
+        stats = self.stats(key)
+        with self._lock:
+            stats.record(latency, ok)
+
+    def rank(self, candidates: Sequence[Candidate], prefer: Optional[str] = None) -> List[Candidate]:
+        """Order candidates: healthy first, then by p50 latency, then the preferred provider.
+
+        Routes with fewer than `min_samples` latencies come before measured
+        ones, the least sampled first. A healthy route of the `prefer`
+        provider goes first whatever its latency, e.g. the local model when
+        it is enabled; the others follow as fallbacks.
+        """
+        def sort_key(candidate):
+            key = candidate[0]
+            stats = self.stats(key)
+            with self._lock:
+                samples = len(stats.latencies)
+                p50 = stats.percentile(50) if samples >= self.min_samples else None
+            requested = prefer is not None and key.startswith(prefer + "/")
+            preferred = self.preferred is not None and key.startswith(self.preferred + "/")
+            measured = p50 is not None
+            return (not stats.healthy, not requested, measured, p50 if measured else samples, not preferred)
+        return sorted(candidates, key=sort_key)
+
+    def hedge_delay(self, key: str) -> float:
+        stats = self.stats(key)
+        if len(stats.latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return stats.percentile(95)
+
+    def summary(self) -> dict:
+        """Rolling p50/p95 latency and error rate for each route seen so far."""
+        with self._lock:
+            return {
+                key: {
+                    "p50": stats.percentile(50),
+                    "p95": stats.percentile(95),
+                    "error_rate": round(stats.error_rate, 3),
+                    "healthy": stats.healthy,
+                }
+                for key, stats in self._stats.items()
+            }
+
+    @property
+    def last_route(self) -> Optional[str]:
+        """Route that answered the calling thread's most recent successful `call()`."""
+        return getattr(self._local, "route", None)
+
+    def forget_route(self):
+        """Clear `last_route` before work that may not go through `call()` on this thread."""
+        self._local.route = None
+
+    def call(self, candidates: Sequence[Candidate], description: str = "Request", prefer: Optional[str] = None):
+        """Run the request on the best route, failing over (or hedging) to the others."""
+        self._local.route = None
+        ranked = self.rank(candidates, prefer)
+        if not ranked:
+            raise ValueError(f"No provider configured for {description.lower()}")
+        if self.hedge and len(ranked) > 1:
+            return self._call_hedged(ranked, description)
+
+        last_error = None
+        for key, fn in ranked:
+            try:
+                result = self._timed(key, fn)
+                self._local.route = key
+                return result
+            except Exception as e:
+                last_error = e
+                logger.warning(f"{description} via {key} failed: {str(e)}")
+        raise last_error
+
+    def _timed(self, key: str, fn: Callable[[], T]) -> T:
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception:
+            self.record(key, time.monotonic() - start, False)
+            raise
+        self.record(key, time.monotonic() - start, True)
+        return result
+
+    def _call_hedged(self, ranked: List[Candidate], description: str):
+        remaining = list(ranked)
+        key, fn = remaining.pop(0)
+        pending = {self._executor.submit(self._timed, key, fn): key}
+        hedge_at = time.monotonic() + self.hedge_delay(key)
+        last_error = None
+
+        while pending:
+            timeout = max(0.0, hedge_at - time.monotonic()) if remaining else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                route = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"{description} via {route} failed: {str(e)}")
+                    continue
+                if pending:
+                    logger.info(f"{description} won by {route}, discarding {list(pending.values())}")
+                    for loser in pending:
+                        loser.add_done_callback(_close_result)
+                self._local.route = route
+                return result
+
+            # Fire the next route when the current ones are slow or have all failed
+            if remaining and (not pending or time.monotonic() >= hedge_at):
+                key, fn = remaining.pop(0)
+                logger.info(f"Hedging {description.lower()} to {key}")
+                pending[self._executor.submit(self._timed, key, fn)] = key
+                hedge_at = time.monotonic() + self.hedge_delay(key)
+        raise last_error
@@ -1,15 +1,62 @@
+import copy
 import os
 import json
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .circular_logger import logger
+
+# Expected types of known config values; anything else is dropped on load
+_SCHEMA = {
+    'api_key': str,
+    'provider': str,
+    'api_keys': dict,
+    'max_recording_time': int,
+    'streaming_enabled': bool,
+    'vad_enabled': bool,
+    'hedging_enabled': bool,
+    'stream_responses': bool,
+    'sample_rate': int,
+    'audio_codec': str,
+    'local_transcription': bool,
+    'local_model': str,
+    'push_to_talk': bool,
+    'push_to_talk_hotkey': str,
+    'context_token_budget': int,
+    'history_audio': bool,
+    'history_context': bool,
+    'vocabulary': list,
+    'replacements': dict,
+}
 
 class SettingsManager:
-    """Handles all application settings and configuration"""
+    """Handles all application settings and configuration
+
+    Settings are cached in memory. The file is only re-read when its mtime
+    changes (checked at most every `check_interval` seconds) and writes
+    happen atomically on a background thread, so reads and saves never
+    block on disk.
+    """
     
-    def __init__(self):
+    def __init__(self, check_interval: float = 2.0):
         self.config_dir = Path.home() / ".whishpy"
         self.config_file = self.config_dir / "config.json"
+        self.check_interval = check_interval
         self._ensure_config_dir_exists()
+        self._lock = threading.Lock()
+        # Held across each read-modify-write in _update(), so concurrent saves cannot undo each other
+        self._update_lock = threading.Lock()
+        self._config = {}
+        self._mtime = None
+        self._last_check = time.monotonic()
+        self._subscribers: Dict[str, list] = {}
+        self._written = threading.Event()
+        self._written.set()
+        self._write_requested = threading.Event()
+        self._reload_if_changed()
+        threading.Thread(target=self._writer, daemon=True).start()
         
     def _ensure_config_dir_exists(self):
         """Ensure the config directory exists"""
@@ -17,38 +64,240 @@ class SettingsManager:
         
     def save_api_key(self, api_key: str, provider: str = "groq") -> None:
         """Save API key and provider to config file"""
-        config = self._load_config()
-        config.update({
-            'api_key': api_key,
-            'provider': provider
-        })
-        self._save_config(config)
+        def change(config):
+            config.update({
+                'api_key': api_key,
+                'provider': provider
+            })
+            config.setdefault('api_keys', {})[provider] = api_key
+        self._update(change)
         
     def load_api_key(self) -> Tuple[Optional[str], str]:
         """Load API key and provider from config file"""
         config = self._load_config()
         return config.get('api_key'), config.get('provider', 'groq')
         
+    def load_api_keys(self) -> Dict[str, str]:
+        """Load the API keys of every provider that has one, keyed by provider"""
+        config = self._load_config()
+        keys = dict(config.get('api_keys', {}))
+        if config.get('api_key'):
+            keys.setdefault(config.get('provider', 'groq'), config['api_key'])
+        return keys
+
     def save_max_recording_time(self, max_time: Optional[int]) -> None:
         """Save max recording time to config file"""
-        config = self._load_config()
-        config['max_recording_time'] = max_time
-        self._save_config(config)
+        self._update(lambda config: config.update(max_recording_time=max_time))
         
     def load_max_recording_time(self) -> Optional[int]:
         """Load max recording time from config file"""
         config = self._load_config()
         return config.get('max_recording_time')
         
+    def save_streaming_enabled(self, enabled: bool) -> None:
+        """Save whether streaming transcription is enabled"""
+        self._update(lambda config: config.update(streaming_enabled=enabled))
+
+    def load_streaming_enabled(self) -> bool:
+        """Load whether streaming transcription is enabled"""
+        config = self._load_config()
+        return config.get('streaming_enabled', False)
+
+    def save_vad_enabled(self, enabled: bool) -> None:
+        """Save whether silence is trimmed before upload"""
+        self._update(lambda config: config.update(vad_enabled=enabled))
+
+    def load_vad_enabled(self) -> bool:
+        """Load whether silence is trimmed before upload"""
+        config = self._load_config()
+        return config.get('vad_enabled', True)
+
+    def save_hedging_enabled(self, enabled: bool) -> None:
+        """Save whether slow requests are hedged to a second provider"""
+        self._update(lambda config: config.update(hedging_enabled=enabled))
+
+    def load_hedging_enabled(self) -> bool:
+        """Load whether slow requests are hedged to a second provider"""
+        config = self._load_config()
+        return config.get('hedging_enabled', False)
+
+    def save_stream_responses(self, enabled: bool) -> None:
+        """Save whether AI responses are inserted while they stream in"""
+        self._update(lambda config: config.update(stream_responses=enabled))
+
+    def load_stream_responses(self) -> bool:
+        """Load whether AI responses are inserted while they stream in"""
+        config = self._load_config()
+        return config.get('stream_responses', True)
+
+    def load_sample_rate(self) -> int:
+        """Load the capture and upload sample rate in Hz"""
+        config = self._load_config()
+        return config.get('sample_rate', 16000)
+
+    def load_audio_codec(self) -> Optional[str]:
+        """Load the upload codec ('flac', 'opus' or 'wav'); None means the provider default"""
+        config = self._load_config()
+        return config.get('audio_codec')
+
+    def save_local_transcription(self, enabled: bool) -> None:
+        """Save whether the on-device Whisper model is used as a provider"""
+        self._update(lambda config: config.update(local_transcription=enabled))
+
+    def load_local_transcription(self) -> bool:
+        """Load whether the on-device Whisper model is used as a provider"""
+        config = self._load_config()
+        return config.get('local_transcription', False)
+
+    def load_local_model(self) -> str:
+        """Load the faster-whisper model size or path used for local transcription"""
+        config = self._load_config()
+        return config.get('local_model', 'base.en')
+
+    def save_push_to_talk(self, enabled: bool) -> None:
+        """Save whether the microphone stays armed for the push-to-talk hotkey"""
+        self._update(lambda config: config.update(push_to_talk=enabled))
+
+    def load_push_to_talk(self) -> bool:
+        """Load whether the microphone stays armed for the push-to-talk hotkey"""
+        config = self._load_config()
+        return config.get('push_to_talk', False)
+
+    def load_push_to_talk_hotkey(self) -> str:
+        """Load the push-to-talk key combination in pynput format, e.g. '<ctrl>+<alt>+<space>'"""
+        config = self._load_config()
+        return config.get('push_to_talk_hotkey', '<ctrl>+<alt>+<space>')
+
+    def load_context_token_budget(self) -> int:
+        """Load the most tokens of selected text sent with a prompt; 0 sends it untrimmed"""
+        config = self._load_config()
+        return config.get('context_token_budget', 4000)
+
+    def load_history_audio(self) -> bool:
+        """Load whether recordings are kept (compressed) alongside their history entries"""
+        config = self._load_config()
+        return config.get('history_audio', False)
+
+    def load_history_context(self) -> bool:
+        """Load whether the selected text sent with a prompt is kept in its history entry"""
+        config = self._load_config()
+        return config.get('history_context', False)
+
+    def load_vocabulary(self) -> List[str]:
+        """Load the terms that transcripts should spell exactly as written, e.g. product names"""
+        config = self._load_config()
+        return [term for term in config.get('vocabulary', []) if isinstance(term, str)]
+
+    def load_replacements(self) -> Dict[str, str]:
+        """Load the spoken phrases to replace, and the text (or snippet) to insert for each"""
+        config = self._load_config()
+        return {spoken: written for spoken, written in config.get('replacements', {}).items()
+                if isinstance(written, str)}
+
+    def subscribe(self, key: str, callback: Callable[[Any], None]) -> None:
+        """Call `callback(new_value)` whenever `key` changes, from the app or on disk"""
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(callback)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until pending changes have been written to disk"""
+        self._written.wait(timeout)
+
     def _load_config(self) -> dict:
-        """Load the config file or return empty dict if it doesn't exist"""
+        """Return a copy of the cached config, reloading it only if the file changed on disk"""
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            self._reload_if_changed()
+        with self._lock:
+            return copy.deepcopy(self._config)
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.config_file).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _reload_if_changed(self) -> None:
+        """Re-read and validate the config file if someone else modified it"""
+        mtime = self._file_mtime()
+        if mtime == self._mtime or not self._written.is_set():
+            return
         try:
             with open(self.config_file, 'r') as f:
-                return json.load(f)
+                config = self._validate(json.load(f))
         except FileNotFoundError:
+            config = {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable config file: {str(e)}")
+            return
+        with self._update_lock:
+            self._mtime = mtime
+            changed = self._swap(config)
+        self._notify(changed)
+
+    def _validate(self, config: dict) -> dict:
+        """Drop values of the wrong type so callers can trust the cached config"""
+        if not isinstance(config, dict):
             return {}
-            
-    def _save_config(self, config: dict) -> None:
-        """Save the config file"""
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f)
+        for key, expected in _SCHEMA.items():
+            if key in config and config[key] is not None and not isinstance(config[key], expected):
+                logger.warning(f"Ignoring invalid config value for {key}: {config[key]!r}")
+                del config[key]
+        return config
+
+    def _swap(self, config: dict) -> list:
+        """Replace the cached config; returns the (key, callback) pairs to notify"""
+        with self._lock:
+            old, self._config = self._config, config
+            return [(key, callback)
+                    for key, callbacks in self._subscribers.items()
+                    if old.get(key) != config.get(key)
+                    for callback in callbacks]
+
+    def _notify(self, changed: list) -> None:
+        """Call subscribers with the current value, which a concurrent update may already have replaced"""
+        for key, callback in changed:
+            with self._lock:
+                value = copy.deepcopy(self._config.get(key))
+            try:
+                callback(value)
+            except Exception as e:
+                logger.error(f"Settings subscriber failed: {str(e)}")
+
+    def _update(self, change: Callable[[dict], None]) -> None:
+        """Apply `change` to the current config, update the cache now and write it to disk in the background
+
+        Subscribers are called after the lock is released, so they may save settings themselves.
+        """
+        # Pick up edits made on disk first, outside the lock, since reloading notifies subscribers
+        self._load_config()
+        with self._update_lock:
+            with self._lock:
+                config = copy.deepcopy(self._config)
+            change(config)
+            changed = self._swap(self._validate(config))
+            self._written.clear()
+            self._write_requested.set()
+        self._notify(changed)
+
+    def _writer(self) -> None:
+        """Background thread that atomically writes the latest config (temp file + rename)"""
+        while True:
+            self._write_requested.wait()
+            self._write_requested.clear()
+            with self._lock:
+                data = json.dumps(self._config)
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=self.config_dir, prefix=".config-", suffix=".json")
+                with os.fdopen(fd, 'w') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.config_file)
+                self._mtime = self._file_mtime()
+            except OSError as e:
+                logger.error(f"Failed to write config file: {str(e)}")
+            finally:
+                if not self._write_requested.is_set():
+                    self._written.set()
@@ -0,0 +1,55 @@
+import importlib
+import sys
+import threading
+import time
+from typing import List, Tuple
+from src.circular_logger import logger
+
+
+class StartupProfile:
+    """Launch timeline: named phase marks plus how long each deferred import took.
+
+    Times are seconds since this module was first imported, which is the first
+    thing main.py does, so the report covers launch-to-ready for the app.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks: List[Tuple[str, float]] = []
+        self.imports: List[Tuple[str, float, str]] = []
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark(self, phase: str):
+        """Record that a startup phase has been reached."""
+        with self._lock:
+            self.marks.append((phase, self.elapsed()))
+        logger.debug(f"Startup: {phase} at {self.elapsed() * 1000:.1f} ms")
+
+    def import_module(self, name: str):
+        """Import a module, recording how long it took if it was not loaded yet."""
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        with self._lock:
+            self.imports.append((name, time.perf_counter() - started, threading.current_thread().name))
+        return module
+
+    def report(self) -> str:
+        """Human-readable timeline of phases followed by imports, slowest first."""
+        with self._lock:
+            marks = list(self.marks)
+            imports = sorted(self.imports, key=lambda entry: entry[1], reverse=True)
+        lines = [f"{phase}: {seconds * 1000:.0f} ms" for phase, seconds in marks]
+        if imports:
+            lines.append("")
+            lines += [f"import {name}: {seconds * 1000:.0f} ms ({thread})" for name, seconds, thread in imports]
+        return "\n".join(lines) or "No startup phases recorded"
+
+
+# Create a global startup profile
+startup_profile = StartupProfile()
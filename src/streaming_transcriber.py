@@ -0,0 +1,106 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from src.audio_codec import encode_wav
+from src.circular_logger import logger
+from src.vad import chunk_rms
+
+
+class StreamingTranscriber:
+    """Cuts a live recording into segments at pauses and transcribes them in the background.
+
+    Feed it raw PCM chunks from the audio callback; each time a pause follows
+    enough speech the pending audio is submitted to the transcription service
+    while recording continues. `finish` flushes the tail and returns the
+    segment transcripts stitched together in order.
+
+    A chunk counts as a pause when its level is less than `speech_ratio`
+    times the recent noise floor (the 10th percentile of the last
+    `noise_window` seconds), so quiet microphones are cut at pauses too.
+    Every segment is submitted; the upload path's VAD skips silent ones.
+    """
+
+    def __init__(self, transcription_service, sample_rate: int, channels: int = 1, sample_width: int = 2,
+                 speech_ratio: float = 4.0, min_level: float = 100.0, noise_window: float = 10.0,
+                 min_silence: float = 0.6, min_segment: float = 5.0, max_segment: float = 30.0,
+                 max_workers: int = 2):
+        self.transcription_service = transcription_service
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.speech_ratio = speech_ratio    # about 12 dB above the noise floor, as the VAD uses
+        self.min_level = min_level          # and never below about -50 dBFS
+        self.min_silence = min_silence
+        self.min_segment = min_segment
+        self.max_segment = max_segment
+        self._bytes_per_second = sample_rate * channels * sample_width
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._silence_bytes = 0
+        # Levels of recent chunks, assuming the audio callback's usual 1024-frame buffers
+        self._levels = deque(maxlen=max(1, int(noise_window * sample_rate / 1024)))
+        self._futures = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="segment")
+
+    def feed(self, data: bytes):
+        """Add a chunk of captured audio, cutting a segment at a pause boundary."""
+        level = chunk_rms(data)
+        with self._lock:
+            self._levels.append(level)
+            noise_floor = sorted(self._levels)[len(self._levels) // 10]
+            voiced = level >= max(noise_floor * self.speech_ratio, self.min_level)
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+            if voiced:
+                self._silence_bytes = 0
+            else:
+                self._silence_bytes += len(data)
+
+            length = self._pending_bytes / self._bytes_per_second
+            paused = self._silence_bytes / self._bytes_per_second >= self.min_silence
+            if (length >= self.min_segment and paused) or length >= self.max_segment:
+                self._submit_pending()
+
+    def _submit_pending(self):
+        """Hand the pending audio to the executor. Caller holds the lock."""
+        if self._pending:
+            index = len(self._futures)
+            logger.info(f"Submitting segment {index} "
+                        f"({self._pending_bytes / self._bytes_per_second:.1f}s)")
+            self._futures.append(self._executor.submit(self._transcribe_segment, index, b''.join(self._pending)))
+        self._pending = []
+        self._pending_bytes = 0
+        self._silence_bytes = 0
+
+    def _transcribe_segment(self, index: int, pcm: bytes) -> str:
+        """Encode one segment in memory and transcribe it."""
+        audio = encode_wav(pcm, self.sample_rate, self.channels, self.sample_width)
+        text = self.transcription_service.transcribe_audio(audio)
+        logger.debug(f"Segment {index} transcribed: {text}")
+        return text or ""
+
+    def finish(self) -> Optional[str]:
+        """Flush the last segment and return the ordered, stitched transcription.
+
+        Raises the first segment error so the caller can fall back to
+        transcribing the whole recording.
+        """
+        with self._lock:
+            self._submit_pending()
+            futures = list(self._futures)
+        try:
+            texts = [future.result() for future in futures]
+        finally:
+            self._executor.shutdown(wait=False)
+        return " ".join(text.strip() for text in texts if text and text.strip())
+
+    def cancel(self):
+        """Drop pending audio and any segments that have not started yet."""
+        with self._lock:
+            self._pending = []
+            self._pending_bytes = 0
+            for future in self._futures:
+                future.cancel()
+        self._executor.shutdown(wait=False)
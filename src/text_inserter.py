@@ -1,23 +1,140 @@
-from pynput.keyboard import Key, Controller
+import re
+import threading
 import time
+from collections import deque
+from typing import Iterable
 from .circular_logger import logger
-import pyperclip
+from .metrics import metrics
+from .startup_profile import startup_profile
+
+# A batch ends after a sentence terminator or a newline, including trailing whitespace
+_FLUSH_BOUNDARY = re.compile(r'(?:[.!?:;](?:\s+)|\n+)')
 
 class TextInserter:
-    def __init__(self):
-        self.keyboard = Controller()
+    def __init__(self, chunk_size=32, restore_delay=0.3, paste_settle=0.1, selection_timeout=0.15):
+        # pynput and pyperclip are loaded by warm_up() or on first use, not at launch
+        self._keyboard = None
+        self._cmd_key = None
+        self._pyperclip = None
+        self._load_lock = threading.Lock()
         self.logger = logger
+        self.chunk_size = chunk_size
+        # Delay between typed chunks, adapted to how fast the target app keeps up
+        self.min_type_delay = 0.002
+        self.max_type_delay = 0.05
+        self.type_delay = self.min_type_delay
+        # The pasted text is left on the clipboard this long before the original is restored
+        self.restore_delay = restore_delay
+        # The target app reads the clipboard some time after Cmd+V, so it is not overwritten sooner than this
+        self.paste_settle = paste_settle
+        self._last_paste_at = 0.0
+        # Without a selection Cmd+C leaves the clipboard alone, so this is how long an empty selection takes
+        self.selection_timeout = selection_timeout
+        self._saved_clipboard = None
+        self._restore_timer = None
+        # Guards the saved clipboard and its restore timer
+        self._clipboard_lock = threading.Lock()
+        # Held for a whole copy, shortcut and clipboard read, so a paste and a selection read never interleave
+        self._paste_lock = threading.Lock()
+        # Recent (strategy, characters, seconds) for every insertion and clipboard read
+        self.timings = deque(maxlen=50)
+
+    def warm_up(self):
+        """Import the keyboard and clipboard libraries and create the keyboard controller."""
+        with self._load_lock:
+            if self._keyboard is None:
+                self._pyperclip = startup_profile.import_module("pyperclip")
+                keyboard = startup_profile.import_module("pynput.keyboard")
+                self._cmd_key = keyboard.Key.cmd
+                self._keyboard = keyboard.Controller()
+
+    @property
+    def keyboard(self):
+        if self._keyboard is None:
+            self.warm_up()
+        return self._keyboard
+
+    @property
+    def clipboard(self):
+        if self._keyboard is None:
+            self.warm_up()
+        return self._pyperclip
+
+    @property
+    def cmd_key(self):
+        if self._keyboard is None:
+            self.warm_up()
+        return self._cmd_key
+
+    def _record_timing(self, strategy, chars, started):
+        elapsed = time.perf_counter() - started
+        self.timings.append((strategy, chars, elapsed))
+        metrics.record(strategy, elapsed, chars=chars)
+        logger.info(f"{strategy} handled {chars} characters in {elapsed * 1000:.1f} ms")
 
     def insert_text(self, text):
-        """Insert text at current cursor position."""
+        """Insert text at current cursor position by typing it in chunks."""
         if not text:
             logger.warning("Empty text received")
             return
 
-        # Simulate typing the text
-        for char in text:
-            self.keyboard.type(char)
-            time.sleep(0.01)  # Small delay for reliability
+        started = time.perf_counter()
+        for i in range(0, len(text), self.chunk_size):
+            chunk = text[i:i + self.chunk_size]
+            chunk_started = time.perf_counter()
+            self.keyboard.type(chunk)
+            # Back off quickly when the target app falls behind, speed up slowly when it keeps up
+            per_char = (time.perf_counter() - chunk_started) / len(chunk)
+            if per_char > 0.002:
+                self.type_delay = min(self.max_type_delay, self.type_delay * 2)
+            else:
+                self.type_delay = max(self.min_type_delay, self.type_delay * 0.75)
+            time.sleep(self.type_delay)
+        self._record_timing("typing", len(text), started)
+
+    def wait_for_clipboard_change(self, previous, timeout=0.5, interval=0.01):
+        """Poll the clipboard until it differs from `previous`; returns None on timeout."""
+        give_up_at = time.monotonic() + timeout
+        while True:
+            current = self.clipboard.paste()
+            if current != previous:
+                return current
+            if time.monotonic() >= give_up_at:
+                return None
+            time.sleep(interval)
+
+    def _settle_after_paste(self):
+        """Wait until the last paste has had `paste_settle` seconds to read the clipboard."""
+        remaining = self._last_paste_at + self.paste_settle - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def _save_clipboard(self):
+        """Remember the user's clipboard unless an earlier paste is still waiting to restore it."""
+        with self._clipboard_lock:
+            if self._restore_timer is not None:
+                self._restore_timer.cancel()
+                self._restore_timer = None
+            else:
+                self._saved_clipboard = self.clipboard.paste()
+
+    def _schedule_restore(self, pasted):
+        """Put the saved clipboard back once the paste has had time to be read."""
+        def restore():
+            with self._paste_lock, self._clipboard_lock:
+                # A newer paste cancelled this restore and took over the saved clipboard
+                if self._restore_timer is not threading.current_thread():
+                    return
+                self._restore_timer = None
+                # Leave the clipboard alone if the user copied something in the meantime
+                if self.clipboard.paste() == pasted and self._saved_clipboard is not None:
+                    self.clipboard.copy(self._saved_clipboard)
+                self._saved_clipboard = None
+
+        with self._clipboard_lock:
+            self._restore_timer = threading.Timer(max(self.restore_delay, self.paste_settle), restore)
+            self._restore_timer.daemon = True
+            self._restore_timer.start()
 
     def insert_text_with_shortcut(self, text):
         """Insert text using Command+V shortcut with fallback to direct typing."""
@@ -26,49 +143,84 @@ class TextInserter:
             return
         
         try:
-            # Copy the text to the clipboard
-            pyperclip.copy(text)
-            logger.info(f"Text copied to clipboard: {text}")
-            
-            # Try paste shortcut first
-            try:
-                with self.keyboard.pressed(Key.cmd):
-                    self.keyboard.press('v')
-                    self.keyboard.release('v')
-                logger.info("Paste shortcut executed successfully")
-            except Exception as e:
-                logger.warning(f"Paste shortcut failed: {str(e)}. Falling back to direct typing")
-                self.insert_text(text)
-                
+            started = time.perf_counter()
+            with self._paste_lock:
+                self._save_clipboard()
+                # Copy the text to the clipboard, once a previous batch's paste has been read
+                self._settle_after_paste()
+                self.clipboard.copy(text)
+                logger.info(f"Text copied to clipboard: {text}")
+
+                # Try paste shortcut first
+                try:
+                    with self.keyboard.pressed(self.cmd_key):
+                        self.keyboard.press('v')
+                        self.keyboard.release('v')
+                    self._last_paste_at = time.monotonic()
+                    logger.info("Paste shortcut executed successfully")
+                    self._record_timing("paste", len(text), started)
+                except Exception as e:
+                    logger.warning(f"Paste shortcut failed: {str(e)}. Falling back to direct typing")
+                    self.insert_text(text)
+                finally:
+                    self._schedule_restore(text)
+
         except Exception as e:
             logger.error(f"Failed to insert text: {str(e)}")
             raise
 
+    def insert_stream(self, chunks: Iterable[str], max_batch: int = 200, max_wait: float = 1.0):
+        """Insert streamed text in batches as it arrives.
+
+        Text is flushed at sentence or line boundaries, or when a batch grows
+        past `max_batch` characters or has waited `max_wait` seconds, so the
+        first sentence appears as soon as the provider produces it.
+        """
+        pending = ""
+        last_flush = time.monotonic()
+        for chunk in chunks:
+            pending += chunk
+            boundary = None
+            for match in _FLUSH_BOUNDARY.finditer(pending):
+                boundary = match.end()
+            if boundary is None and (len(pending) >= max_batch or time.monotonic() - last_flush >= max_wait):
+                # Flush up to the last space so words are never split across batches
+                space = pending.rfind(' ')
+                boundary = space + 1 if space > 0 else len(pending)
+            if boundary:
+                self.insert_text_with_shortcut(pending[:boundary])
+                pending = pending[boundary:]
+                last_flush = time.monotonic()
+        if pending:
+            self.insert_text_with_shortcut(pending)
+
     def get_selected_text(self):
         """Get the currently selected text from the clipboard."""
         try:
-            # Store current clipboard content
-            original_clipboard = pyperclip.paste()
-            
-            # Clear clipboard to ensure we get fresh selection
-            pyperclip.copy('')
-            
-            # Copy selected text to clipboard
-            with self.keyboard.pressed(Key.cmd):
-                self.keyboard.press('c')
-                self.keyboard.release('c')
-            
-            # Add delay to ensure clipboard is updated
-            time.sleep(0.2)
-            
-            # Get the selected text
-            selected_text = pyperclip.paste()
-            
-            if selected_text == '':
-                selected_text = original_clipboard
-            
-            # Restore original clipboard content
-            pyperclip.copy(original_clipboard)
+            started = time.perf_counter()
+            with self._paste_lock:
+                # Store current clipboard content
+                original_clipboard = self.clipboard.paste()
+
+                # Replace it with a marker so a fresh copy is detectable, even of identical text
+                marker = f"whishpy-selection-{time.time_ns()}"
+                self._settle_after_paste()
+                self.clipboard.copy(marker)
+
+                # Copy selected text to clipboard
+                with self.keyboard.pressed(self.cmd_key):
+                    self.keyboard.press('c')
+                    self.keyboard.release('c')
+
+                # Wait for the clipboard to actually change instead of a fixed delay
+                selected_text = self.wait_for_clipboard_change(marker, self.selection_timeout)
+
+                if not selected_text:
+                    selected_text = original_clipboard
+
+                # Restore original clipboard content
+                self.clipboard.copy(original_clipboard)
+            self._record_timing("selection", len(selected_text), started)
             self.logger.info(f"Selected text from clipboard: {selected_text}")
             return selected_text
         except Exception as e:
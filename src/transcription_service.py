@@ -1,38 +1,164 @@
 import os
-import rumps
+import threading
 import time
-from typing import Optional
-from .config import save_api_key, load_api_key
-from src.llm import LLM
-from src.circular_logger import logger, setup_logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Union
+from .config import (save_api_key, load_api_key, load_api_keys, load_sample_rate, load_audio_codec,
+                     load_vad_enabled, load_hedging_enabled, load_local_transcription, load_local_model,
+                     load_context_token_budget, load_vocabulary, load_replacements, subscribe)
+from src.llm import CHAT_MODELS, LLM
+from src.retry import RetryPolicy
+from src.router import ProviderRouter
+from src.audio_codec import EncodedAudio, PROVIDER_CODECS, encode_wav, transcode
+from src.local_whisper import LocalWhisper
+from src.rate_limiter import rate_limiter
+from src.vad import split_points, trim_silence
+from src.vocabulary import Vocabulary
+from src.circular_logger import logger
+from src.metrics import metrics
+
+# Transcription model used for each provider
+TRANSCRIPTION_MODELS = {
+    "groq": "whisper-large-v3-turbo",
+    "openai": "whisper-1",
+}
+
+# Instructions sent ahead of the vocabulary in each provider's transcription prompt
+TRANSCRIPTION_PROMPTS = {
+    "groq": "Fix any grammar and punctuation errors. Do not add any additional text or commentary.",
+}
+
+# Both providers reject uploads over 25 MB; chunks of long recordings stay below this even as WAV
+MAX_UPLOAD_BYTES = 24 * 1024 * 1024
+
+# Provider name of the on-device model; its model is configurable, so it is not in TRANSCRIPTION_MODELS
+LOCAL_PROVIDER = "local"
 
 class TranscriptionService:
-    def __init__(self):
-        self._llm_instance = None
+    def __init__(self, interactive: bool = True):
+        # Headless callers (CLI, benchmarks) never get the API key dialog
+        self.interactive = interactive
+        self._llm_instances: Dict[str, LLM] = {}
+        self._llm_lock = threading.RLock()
         self.api_key = None
         self.provider = 'groq'
         self._load_api_key()
-        self.max_retries = 3
-        self.retry_delay = 2  # seconds
-        setup_logging()
+        # Every provider with a saved key is a candidate route; the selected one is preferred
+        self.api_keys = load_api_keys()
+        if self.api_key:
+            self.api_keys[self.provider] = self.api_key
+        self.router = ProviderRouter(preferred=self.provider, hedge=load_hedging_enabled())
+        self.sample_rate = load_sample_rate()
+        self.audio_codec = load_audio_codec()
+        self.vad_enabled = load_vad_enabled()
+        # The local model only handles recordings up to local_max_seconds, where it beats a round trip
+        self.local_enabled = load_local_transcription()
+        self.local_whisper = LocalWhisper(load_local_model())
+        self.local_max_seconds = 30
+        # Selected text sent with a prompt is trimmed to what is relevant once it exceeds this many tokens
+        self.context_budget = load_context_token_budget()
+        # Compiled in warm_up(), off the launch path, and again whenever the dictionary changes
+        self.vocabulary = Vocabulary()
+        # Pick up settings changes (from the menu or config.json) without re-reading the file
+        subscribe('vad_enabled', lambda enabled: setattr(self, 'vad_enabled', enabled is not False))
+        subscribe('hedging_enabled', lambda enabled: setattr(self.router, 'hedge', bool(enabled)))
+        subscribe('audio_codec', lambda codec: setattr(self, 'audio_codec', codec))
+        subscribe('sample_rate', lambda rate: setattr(self, 'sample_rate', rate or load_sample_rate()))
+        subscribe('provider', self._on_provider_changed)
+        subscribe('api_keys', self._on_api_keys_changed)
+        subscribe('local_transcription', self._on_local_transcription_changed)
+        subscribe('local_model', self._on_local_model_changed)
+        subscribe('vocabulary', self._reload_vocabulary)
+        subscribe('replacements', self._reload_vocabulary)
+        subscribe('context_token_budget', lambda budget: setattr(
+            self, 'context_budget', budget if budget is not None else load_context_token_budget()))
+        # End-to-end budget for a transcription, extended for long recordings
+        self.latency_budget = 30  # seconds
+        # Longer recordings are split at pauses and the chunks transcribed in parallel
+        self.chunk_seconds = 120
+        self.chunk_workers = 4
+        self.retry_policy = RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=4.0)
 
     @property
     def llm(self) -> LLM:
-        """Get the LLM instance, creating it if necessary"""
-        if self._llm_instance is None:
-            if not self.api_key:
-                raise ValueError("API key is not set")
-            self._llm_instance = LLM(self.api_key, self.provider)
-        return self._llm_instance
+        """Get the LLM instance of the selected provider, creating it if necessary"""
+        return self.llm_for(self.provider)
+
+    def llm_for(self, provider: str) -> LLM:
+        """Get the LLM instance of a provider, creating it if necessary"""
+        with self._llm_lock:
+            if provider not in self._llm_instances:
+                if not self.api_keys.get(provider):
+                    raise ValueError("API key is not set")
+                self._reset_llm()
+            return self._llm_instances[provider]
+
+    def warm_up(self):
+        """Import the provider SDKs and open warm connections before the first dictation."""
+        self._reload_vocabulary()
+        with self._llm_lock:
+            if self.api_keys and not self._llm_instances:
+                self._reset_llm()
+        if self.local_enabled:
+            self.local_whisper.start()
+
+    def _reset_llm(self):
+        """Replace the LLM instances and start warming their pooled connections."""
+        with self._llm_lock:
+            for llm in self._llm_instances.values():
+                llm.stop_keepalive()
+            self._llm_instances = {}
+            for provider, api_key in self.api_keys.items():
+                try:
+                    self._llm_instances[provider] = LLM(api_key, provider)
+                except ValueError as e:
+                    logger.error(f"Skipping provider {provider}: {str(e)}")
+                    continue
+                self._llm_instances[provider].start_keepalive()
+
+    def _reload_vocabulary(self, _=None):
+        """Recompile the vocabulary matcher from the saved terms and replacements"""
+        started = time.perf_counter()
+        self.vocabulary = Vocabulary(load_vocabulary(), load_replacements())
+        if len(self.vocabulary):
+            logger.info(f"Compiled {len(self.vocabulary)} vocabulary entries in "
+                        f"{(time.perf_counter() - started) * 1000:.1f}ms")
+
+    def _on_provider_changed(self, provider):
+        self.provider = provider or 'groq'
+        self.router.preferred = self.provider
+
+    def _on_api_keys_changed(self, _):
+        """Rebuild (and re-warm) the provider clients when a key is added or changed"""
+        self.api_key, self.provider = load_api_key()
+        self.api_keys = load_api_keys()
+        self._reset_llm()
+
+    def _on_local_transcription_changed(self, enabled):
+        self.local_enabled = bool(enabled)
+        if self.local_enabled:
+            self.local_whisper.start()
+        else:
+            self.local_whisper.stop()
+
+    def _on_local_model_changed(self, model):
+        """Swap the resident model, loading the new one in the background"""
+        self.local_whisper.stop()
+        self.local_whisper = LocalWhisper(model or load_local_model())
+        if self.local_enabled:
+            self.local_whisper.start()
 
     def _load_api_key(self):
         """Load API key and provider from config file or prompt user."""
         self.api_key, self.provider = load_api_key()
-        if not self.api_key:
+        if not self.api_key and self.interactive:
             self._prompt_for_api_key()
 
     def _prompt_for_api_key(self):
         """Prompt user for API key and provider, then save to config."""
+        # Imported here so the service can run headless (CLI, benchmarks) without the menu bar UI
+        import rumps
+
         api_key, _ = load_api_key()
         
         # Create window with provider selection buttons
@@ -81,50 +207,179 @@ class TranscriptionService:
         # Save API key and provider
         self.api_key = key_response.text
         logger.info(f"API key: {self.api_key}, Provider: {self.provider}")
+        # Subscribers rebuild the LLM instances and warm them in the background
         save_api_key(self.api_key, self.provider)
-        # Clear cached LLM instance when API key changes
-        self._llm_instance = None
 
-    def transcribe_audio(self, audio_file_path: str) -> Optional[str]:
-        """Transcribe audio using Groq's Whisper API with retry logic."""
-        last_error = None
-        
-        for attempt in range(self.max_retries):
-            try:
-                with open(audio_file_path, "rb") as audio_file:
-                    try:
-                        if self.provider == "groq":
-                            response = self.llm.groq.audio.transcriptions.create(
-                                file=(audio_file_path, audio_file.read()),
-                                model="whisper-large-v3-turbo",
-                                language="en",
-                                temperature=0,
-                                timeout=10,  # 10 second timeout
-                                prompt="Fix any grammar and punctuation errors. Do not add any additional text or commentary."
-                            )
-                        elif self.provider == "openai":
-                            response = self.llm.openai.audio.transcriptions.create(
-                                file=(audio_file_path, audio_file.read()),
-                                model="whisper-1",
-                                language="en",
-                                temperature=0,
-                                timeout=10  # 10 second timeout
-                            )
-                    except Exception as e:
-                        print(f"Transcription attempt {attempt + 1} failed: {e}")
-                        raise
-                return (response.text or "").strip()
-            except Exception as e:
-                last_error = e
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
+    def transcribe_audio(self, audio: Union[EncodedAudio, str]) -> Optional[str]:
+        """Transcribe in-memory audio (or an audio file path) on the fastest healthy provider."""
+        if isinstance(audio, str):
+            audio = EncodedAudio.from_file(audio)
+        if audio.pcm is not None and audio.sample_width == 2 and audio.duration > self._max_chunk_seconds():
+            return self._transcribe_chunked(audio)
+        if self.vad_enabled:
+            with metrics.span("vad", audio_seconds=round(audio.duration, 2)):
+                trimmed = trim_silence(audio)
+            if trimmed is None:
+                logger.info("No speech detected, skipping transcription")
+                return ""
+            audio = trimmed
+
+        give_up_at = time.monotonic() + self.latency_budget + audio.duration * 0.2
+        # Encodings shared by this request's routes, which may run concurrently when hedged
+        payloads, payloads_lock = {}, threading.Lock()
+        candidates = [
+            (f"{provider}/{TRANSCRIPTION_MODELS[provider]}",
+             lambda provider=provider: self._transcribe_with(provider, audio, payloads, payloads_lock, give_up_at))
+            for provider in self.api_keys if provider in TRANSCRIPTION_MODELS
+        ]
+        # Short dictations go to the resident local model first; the router fails over to the
+        # remote routes if it errors or becomes unhealthy
+        prefer = None
+        local = self.local_whisper
+        short = 0 < audio.duration <= self.local_max_seconds
+        if self.local_enabled and local.ready and (short or not candidates):
+            candidates.append((f"{LOCAL_PROVIDER}/{local.model_size}",
+                               lambda: self._transcribe_locally(local, audio, give_up_at)))
+            prefer = LOCAL_PROVIDER
+        with metrics.span("transcription", audio_seconds=round(audio.duration, 2)):
+            return self.router.call(candidates, "Transcription", prefer=prefer)
+
+    def quota_warning(self, audio_seconds: float = 30.0) -> Optional[str]:
+        """Describe why a dictation of `audio_seconds` would currently be rate limited everywhere, or None."""
+        if self.local_enabled and self.local_whisper.ready:
+            return None
+        reasons = []
+        for provider in self.api_keys:
+            if provider not in TRANSCRIPTION_MODELS:
                 continue
-        raise Exception(f"Transcription failed after {self.max_retries} attempts: {str(last_error)}")
+            headroom = rate_limiter.headroom(f"{provider}/transcription")
+            blocked = [
+                f"{name.replace('_', ' ')} resets in {room['full_in']:g}s"
+                for name, room in headroom.items()
+                if room["remaining"] < (audio_seconds if name.startswith("audio_seconds") else 1)
+            ]
+            if not blocked:
+                return None
+            reasons.append(f"{provider}: {', '.join(blocked)}")
+        return "; ".join(reasons) or None
+
+    def _max_chunk_seconds(self) -> float:
+        return min(self.chunk_seconds, MAX_UPLOAD_BYTES / (self.sample_rate * 2))
+
+    def _transcribe_chunked(self, audio: EncodedAudio) -> str:
+        """Split a long recording at pauses, transcribe the chunks in parallel and join them in order."""
+        pcm = memoryview(audio.pcm)
+        frame_bytes = audio.channels * audio.sample_width
+        cuts = split_points(pcm, audio.sample_rate, audio.channels, self._max_chunk_seconds())
+        bounds = zip([0] + cuts, cuts + [pcm.nbytes // frame_bytes])
+        # Chunks are views into the recording; each is only encoded when its upload is prepared
+        chunks = [encode_wav(pcm[start * frame_bytes:end * frame_bytes], audio.sample_rate, audio.channels)
+                  for start, end in bounds]
+        logger.info(f"Transcribing {audio.duration:.0f}s recording as {len(chunks)} chunks")
+        with metrics.span("chunked_transcription", audio_seconds=round(audio.duration, 2), chunks=len(chunks)):
+            with ThreadPoolExecutor(max_workers=self.chunk_workers, thread_name_prefix="chunk") as executor:
+                texts = list(executor.map(self.transcribe_audio, chunks))
+        return " ".join(text for text in texts if text)
+
+    def _payload_for(self, provider: str, audio: EncodedAudio, payloads: dict,
+                     lock: threading.Lock) -> EncodedAudio:
+        """Encode audio in the provider's codec, reusing an identical encoding if one exists."""
+        codec = self.audio_codec or PROVIDER_CODECS.get(provider, "wav")
+        # A hedged route needing the same codec waits for the first encoding instead of repeating it
+        with lock:
+            if codec not in payloads:
+                with metrics.span("transcode", codec=codec, audio_seconds=round(audio.duration, 2)) as span:
+                    payload = transcode(audio, codec, self.sample_rate)
+                    span["payload_bytes"] = len(payload)
+                logger.info(f"Uploading {len(payload)} bytes as {payload.codec} "
+                            f"({audio.pcm_bytes} bytes PCM, {payload.duration:.1f}s)")
+                payloads[codec] = payload
+            return payloads[codec]
+
+    def _transcribe_with(self, provider: str, audio: EncodedAudio, payloads: dict, payloads_lock: threading.Lock,
+                         give_up_at: float) -> str:
+        """Transcribe on one provider with retries, within the overall latency budget."""
+        llm = self.llm_for(provider)
+        payload = self._payload_for(provider, audio, payloads, payloads_lock)
+        # The payload is built once and reused by every attempt
+        upload = (payload.filename, payload.data)
+        prompt = self.vocabulary.prompt(TRANSCRIPTION_PROMPTS.get(provider, ""))
+        attempts = 0
+        # Audio quotas bill at least 10 seconds per request
+        audio_seconds = max(payload.duration, 10.0)
+
+        def attempt(timeout: float):
+            nonlocal attempts
+            attempts += 1
+            # Wait for quota here instead of sending a request that comes back as a 429
+            started = time.monotonic()
+            rate_limiter.acquire(f"{provider}/transcription", max(0.0, timeout - self.retry_policy.min_attempt_time),
+                                 requests=1, audio_seconds=audio_seconds)
+            timeout -= time.monotonic() - started
+            with metrics.span("upload", provider=provider, model=TRANSCRIPTION_MODELS.get(provider),
+                              attempt=attempts, payload_bytes=len(payload),
+                              audio_seconds=round(payload.duration, 2)):
+                return request(timeout)
+
+        def request(timeout: float):
+            if provider == "groq":
+                return llm.groq.audio.transcriptions.create(
+                    file=upload,
+                    model=TRANSCRIPTION_MODELS["groq"],
+                    language="en",
+                    temperature=0,
+                    timeout=timeout,
+                    prompt=prompt
+                )
+            elif provider == "openai":
+                return llm.openai.audio.transcriptions.create(
+                    file=upload,
+                    model=TRANSCRIPTION_MODELS["openai"],
+                    language="en",
+                    temperature=0,
+                    timeout=timeout,
+                    **({"prompt": prompt} if prompt else {})
+                )
+            raise ValueError("Invalid provider. Must be 'groq' or 'openai'.")
+
+        remaining = give_up_at - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Transcription latency budget exhausted")
+        response = self.retry_policy.call(attempt, f"Transcription via {provider}", deadline=remaining)
+        return (response.text or "").strip()
+
+    def _transcribe_locally(self, local: LocalWhisper, audio: EncodedAudio, give_up_at: float) -> str:
+        """Transcribe on the on-device model; there is nothing to retry, so failures go to the router."""
+        remaining = give_up_at - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Transcription latency budget exhausted")
+        with metrics.span("local_inference", model=local.model_size, audio_seconds=round(audio.duration, 2)):
+            return local.transcribe(audio, timeout=remaining, prompt=self.vocabulary.prompt())
+
+    def stream_response_with_context(self, prompt: str, context: str):
+        """Open a streaming response on the fastest healthy LLM and return its text deltas."""
+        give_up_at = time.monotonic() + 60
+        candidates = [
+            (f"{provider}/{CHAT_MODELS[provider]}",
+             lambda provider=provider: self.llm_for(provider).stream_response(
+                 prompt, context, deadline=give_up_at - time.monotonic(), context_budget=self.context_budget))
+            for provider in self.api_keys if provider in CHAT_MODELS
+        ]
+        try:
+            return self.router.call(candidates, "Response streaming")
+        except Exception as e:
+            raise Exception(f"LLM generation failed: {str(e)}")
 
     def generate_response_with_context(self, prompt: str, context: str) -> str:
-        """Generate a response from the LLM with the given prompt and context."""
+        """Generate a response from the fastest healthy LLM with the given prompt and context."""
+        give_up_at = time.monotonic() + 60
+        candidates = [
+            (f"{provider}/{CHAT_MODELS[provider]}",
+             lambda provider=provider: self.llm_for(provider).generate_response(
+                 prompt, context, deadline=give_up_at - time.monotonic(), context_budget=self.context_budget))
+            for provider in self.api_keys if provider in CHAT_MODELS
+        ]
         try:
-            response = self.llm.generate_response(prompt, context)
-            return response
+            return self.router.call(candidates, "Response generation")
         except Exception as e:
             raise Exception(f"LLM generation failed: {str(e)}")
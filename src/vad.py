@@ -0,0 +1,133 @@
+from typing import TYPE_CHECKING, List, Optional
+from src.audio_codec import EncodedAudio, encode_wav
+from src.circular_logger import logger
+
+# NumPy is imported where it is used, as in audio_codec, to keep it off the launch path
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def chunk_rms(data: bytes) -> float:
+    """Root-mean-square level of a chunk of 16-bit little-endian PCM."""
+    import numpy as np
+    samples = np.frombuffer(data, dtype=np.int16)
+    if not samples.size:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)))
+
+
+class VoiceActivityDetector:
+    """Energy and zero-crossing voice activity detector over fixed-size frames.
+
+    Every step is a whole-array NumPy operation over the frame matrix, so a
+    multi-minute recording is classified in a few milliseconds.
+    """
+
+    def __init__(self, frame_ms: int = 20, threshold_db: float = 12.0, min_level_db: float = -50.0,
+                 max_zcr: float = 0.35, hangover_ms: int = 200, max_pause: float = 0.6,
+                 min_speech: float = 0.25):
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db    # speech must be this far above the noise floor
+        self.min_level_db = min_level_db    # and never below this level (dBFS)
+        self.max_zcr = max_zcr              # noise-like frames cross zero more often than voiced speech
+        self.hangover_ms = hangover_ms      # speech padding kept around every voiced frame
+        self.max_pause = max_pause          # internal pauses are shortened to this many seconds
+        self.min_speech = min_speech        # less voiced audio than this counts as no speech
+
+    def _frames(self, samples: "np.ndarray", sample_rate: int) -> "np.ndarray":
+        """Reshape (n, channels) samples into (frames, frame_len, channels), dropping the remainder."""
+        frame_len = max(1, sample_rate * self.frame_ms // 1000)
+        count = len(samples) // frame_len
+        return samples[:count * frame_len].reshape(count, frame_len, samples.shape[1])
+
+    def speech_mask(self, samples: "np.ndarray", sample_rate: int) -> "np.ndarray":
+        """Classify each frame as speech (True) or silence, including hangover padding."""
+        import numpy as np
+        frames = self._frames(samples, sample_rate)
+        if not len(frames):
+            return np.zeros(0, dtype=bool)
+        mono = frames.mean(axis=2) / 32768.0
+
+        energy_db = 10 * np.log10(np.mean(mono ** 2, axis=1) + 1e-10)
+        noise_floor = np.percentile(energy_db, 10)
+        threshold = max(noise_floor + self.threshold_db, self.min_level_db)
+        zcr = np.mean(np.abs(np.diff(np.signbit(mono).astype(np.int8), axis=1)), axis=1)
+
+        # Loud frames are speech regardless of ZCR (fricatives); quieter ones must also look voiced
+        loud = energy_db >= threshold + self.threshold_db
+        mask = (energy_db >= threshold) & ((zcr <= self.max_zcr) | loud)
+
+        hangover = self.hangover_ms // self.frame_ms
+        if hangover and mask.any():
+            kernel = np.ones(2 * hangover + 1)
+            mask = np.convolve(mask.astype(np.float32), kernel, mode='same') > 0
+        return mask
+
+    def trim(self, pcm, sample_rate: int, channels: int = 1) -> Optional["np.ndarray"]:
+        """Trim leading/trailing silence and shorten long pauses.
+
+        Returns the kept int16 samples with shape (n, channels), or None if
+        the audio contains no speech.
+        """
+        import numpy as np
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+        mask = self.speech_mask(samples, sample_rate)
+        voiced_seconds = mask.sum() * self.frame_ms / 1000
+        if voiced_seconds < self.min_speech:
+            return None
+
+        keep = mask.copy()
+        # Re-admit the edges of each internal pause so words are not glued together
+        edges = np.flatnonzero(np.diff(mask.astype(np.int8)))
+        pause_starts = edges[mask[edges]] + 1
+        pause_ends = edges[~mask[edges]] + 1
+        pause_ends = pause_ends[pause_ends > pause_starts[0]] if len(pause_starts) else pause_ends
+        half_pause = int(self.max_pause * 1000 / self.frame_ms) // 2
+        for start, end in zip(pause_starts, pause_ends):
+            keep[start:min(end, start + half_pause)] = True
+            keep[max(start, end - half_pause):end] = True
+
+        frames = self._frames(samples, sample_rate)
+        return frames[keep].reshape(-1, channels)
+
+
+def split_points(pcm, sample_rate: int, channels: int = 1, max_seconds: float = 600.0,
+                 search_seconds: float = 30.0, frame_ms: int = 50) -> List[int]:
+    """Sample offsets at which to cut 16-bit PCM into chunks of at most `max_seconds`.
+
+    Each cut is placed in the quietest frame of the last `search_seconds`
+    before the limit, so words are not split. Only those windows are read,
+    so a memory-mapped recording is never loaded as a whole.
+    """
+    import numpy as np
+    samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+    max_len = int(max_seconds * sample_rate)
+    search = min(int(search_seconds * sample_rate), max_len // 2)
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    cuts = []
+    start = 0
+    while len(samples) - start > max_len:
+        window_start = start + max_len - search
+        window = samples[window_start:start + max_len]
+        count = len(window) // frame_len
+        frames = window[:count * frame_len].reshape(count, frame_len, channels).astype(np.float32)
+        quietest = int(np.argmin(np.mean(frames ** 2, axis=(1, 2))))
+        start = window_start + quietest * frame_len + frame_len // 2
+        cuts.append(start)
+    return cuts
+
+
+def trim_silence(audio: EncodedAudio, detector: Optional[VoiceActivityDetector] = None) -> Optional[EncodedAudio]:
+    """Return recorded audio with silence trimmed, or None if it contains no speech.
+
+    Payloads without raw PCM (e.g. files read from disk) are returned as-is.
+    """
+    if audio.pcm is None or audio.sample_width != 2:
+        return audio
+    detector = detector or VoiceActivityDetector()
+    samples = detector.trim(audio.pcm, audio.sample_rate, audio.channels)
+    if samples is None:
+        return None
+    trimmed = encode_wav(samples.tobytes(), audio.sample_rate, audio.channels)
+    logger.info(f"Silence trimming kept {trimmed.duration:.1f}s of {audio.duration:.1f}s")
+    return trimmed
@@ -0,0 +1,195 @@
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.context_packer import TokenEstimator
+
+_SPACES = re.compile(r"\s+")
+
+# Whisper only reads the last 224 tokens of its prompt
+MAX_PROMPT_TOKENS = 224
+
+# Replacement texts longer than this are snippets, not spellings worth priming the model with
+_MAX_TERM_WORDS = 4
+
+
+def normalize_phrase(phrase: str) -> str:
+    return _SPACES.sub(" ", phrase.strip()).lower()
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over lower-case phrases.
+
+    `find()` walks the text once, whatever the number of phrases, and
+    returns leftmost-longest, non-overlapping matches that start and end
+    on word boundaries.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = list(phrases)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail = [0]
+        # Length of the longest phrase ending at each node, and the next node on the fail chain that ends one
+        self._match: List[Optional[int]] = [None]
+        self._output_link = [0]
+        self._phrase_at: Dict[int, int] = {}
+        for index, phrase in enumerate(self.phrases):
+            node = 0
+            for char in phrase:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._match.append(None)
+                    self._output_link.append(0)
+                node = next_node
+            if phrase and self._match[node] is None:
+                self._match[node] = len(phrase)
+                self._phrase_at[node] = index
+        self._build_links()
+
+    def _build_links(self):
+        """Breadth-first, so each node's fail target is finished before its children need it."""
+        # Children of the root fail back to the root
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                link = self._fail[child]
+                self._output_link[child] = link if self._match[link] is not None else self._output_link[link]
+                queue.append(child)
+
+    def find(self, text: str) -> List[Tuple[int, int, int]]:
+        """(start, end, phrase index) of each whole-word match in `text`, which must be lower-case."""
+        goto, fail, match, output_link = self._goto, self._fail, self._match, self._output_link
+        # Longest match starting at each position; a later, longer match supersedes an earlier one
+        best: Dict[int, Tuple[int, int]] = {}
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = node if match[node] is not None else output_link[node]
+            while found:
+                start = end - match[found]
+                if ((start == 0 or not _is_word_char(text[start - 1]) or not _is_word_char(text[start]))
+                        and (end == len(text) or not _is_word_char(text[end]) or not _is_word_char(text[end - 1]))):
+                    if start not in best or best[start][0] < end:
+                        best[start] = (end, self._phrase_at[found])
+                found = output_link[found]
+
+        matches, position = [], 0
+        for start in sorted(best):
+            if start >= position:
+                end, index = best[start]
+                matches.append((start, end, index))
+                position = end
+        return matches
+
+
+class Vocabulary:
+    """User dictionary of spellings and replacements, compiled once into a PhraseMatcher.
+
+    `terms` are words spelled the way they should appear (product names,
+    jargon); wherever they are transcribed in another case they are fixed.
+    `replacements` map a spoken phrase to the text to insert instead,
+    which may be a whole snippet. Short terms and replacement texts also
+    prime the transcription prompt, the most frequently used first.
+    """
+
+    def __init__(self, terms: Iterable[str] = (), replacements: Optional[Dict[str, str]] = None,
+                 estimator: Optional[TokenEstimator] = None):
+        self.replacements: Dict[str, str] = {}
+        for term in terms:
+            if term.strip():
+                self.replacements.setdefault(normalize_phrase(term), term.strip())
+        for spoken, written in (replacements or {}).items():
+            if spoken.strip():
+                self.replacements[normalize_phrase(spoken)] = written
+        phrases = list(self.replacements)
+        self._matcher = PhraseMatcher(phrases)
+        self._written = [self.replacements[phrase] for phrase in phrases]
+
+        # Whisper's tokenizer is GPT-2's, much smaller than the chat models' vocabularies
+        estimator = estimator or TokenEstimator(word_chars=4.0, margin=1.2)
+        self.prompt_terms: List[str] = []
+        self._term_tokens: Dict[str, int] = {}
+        for written in dict.fromkeys(self._written):
+            if "\n" in written or len(written.split()) > _MAX_TERM_WORDS:
+                continue
+            self.prompt_terms.append(written)
+            # Plus one for the separating comma
+            self._term_tokens[written] = estimator.count(written) + 1
+        self._estimator = estimator
+        self._uses = Counter()
+        # Built prompts by (base, max_tokens), until the usage ranking changes
+        self._prompts: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.replacements)
+
+    def apply(self, text: str) -> str:
+        """Replace every dictionary phrase in `text` in a single pass."""
+        if not text or not self.replacements:
+            return text
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters change length when lower-cased; keep offsets aligned with the original
+            lowered = "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+        matches = self._matcher.find(lowered)
+        if not matches:
+            return text
+
+        parts, position = [], 0
+        for start, end, index in matches:
+            parts.append(text[position:start])
+            parts.append(self._written[index])
+            position = end
+        parts.append(text[position:])
+        self._record_uses(self._written[index] for _, _, index in matches)
+        return "".join(parts)
+
+    def _record_uses(self, written: Iterable[str]):
+        used = [term for term in written if term in self._term_tokens]
+        if not used:
+            return
+        with self._lock:
+            self._uses.update(used)
+            self._prompts.clear()
+
+    def prompt(self, base: str = "", max_tokens: int = MAX_PROMPT_TOKENS) -> str:
+        """`base` followed by as many dictionary terms as fit in `max_tokens`, most used first."""
+        if not self.prompt_terms:
+            return base
+        with self._lock:
+            prompt = self._prompts.get((base, max_tokens))
+            if prompt is not None:
+                return prompt
+            # Terms that have come up in transcripts first, then the rest in dictionary order
+            used = [term for term, _ in self._uses.most_common()]
+        ranked = used + [term for term in self.prompt_terms if term not in self._uses]
+        prefix = f"{base} Vocabulary: " if base else "Vocabulary: "
+        budget = max_tokens - self._estimator.count(prefix) - 1
+        chosen = []
+        for term in ranked:
+            cost = self._term_tokens[term]
+            if cost > budget:
+                continue
+            chosen.append(term)
+            budget -= cost
+            if budget <= 1:
+                break
+        prompt = f"{prefix}{', '.join(chosen)}." if chosen else base
+        with self._lock:
+            self._prompts[(base, max_tokens)] = prompt
+        return prompt
@@ -0,0 +1,37 @@
+from benchmarks.fake_audio import FakePyAudio, synthetic_speech
+from src.audio_recorder import AudioRecorder
+
+
+def record(recorder, samples):
+    recorder.audio.samples = samples
+    assert recorder.start_recording()
+    assert recorder.audio.stream.exhausted.wait(10)
+    return recorder.stop_recording()
+
+
+def test_next_recording_leaves_queued_audio_intact():
+    # Longer than the preallocated minute, so the second recording has to grow its buffer
+    first_samples, second_samples = synthetic_speech(70, seed=0), synthetic_speech(70, seed=1)
+    recorder = AudioRecorder(audio_interface=FakePyAudio(first_samples, speed=100))
+
+    first = record(recorder, first_samples)
+    second = record(recorder, second_samples)
+
+    assert bytes(first.pcm) == first_samples.tobytes()
+    assert bytes(second.pcm) == second_samples.tobytes()
+
+
+def test_spill_threshold_follows_the_capture_rate():
+    # The device only records at 48 kHz, so two seconds spill after three times as many bytes as at 16 kHz
+    samples = synthetic_speech(3, sample_rate=48000)
+    recorder = AudioRecorder(audio_interface=FakePyAudio(samples, sample_rate=48000, speed=20), spill_after=2)
+    recorder.audio.samples = samples
+    assert recorder.start_recording()
+    assert recorder.capture_rate == 48000
+    assert recorder.buffer.spill_threshold == 48000 * 2 * 2
+    assert recorder.audio.stream.exhausted.wait(10)
+    assert recorder.buffer.spilled
+    audio = recorder.stop_recording()
+
+    assert bytes(audio.pcm) == samples.tobytes()
+    assert not recorder.buffer.spilled
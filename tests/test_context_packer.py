@@ -0,0 +1,28 @@
+import random
+
+from src.context_packer import GAP_MARKER, pack_context
+
+WORDS = "alpha beta gamma delta epsilon zeta theta kappa lambda sigma omega ratio 123 x. naïve".split()
+
+
+def test_packed_context_never_exceeds_budget():
+    rng = random.Random(0)
+    for _ in range(100):
+        paragraphs = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 60)))
+                      for _ in range(rng.randint(2, 30))]
+        context = "\n\n".join(paragraphs)
+        budget = rng.randint(20, 400)
+        for model in ("llama-3.3-70b-versatile", "gpt-4o-mini-2024-07-18", "unknown"):
+            packed = pack_context("gamma ratio", context, model, budget)
+            assert packed.tokens <= budget
+
+
+def test_relevant_paragraph_is_kept_in_place():
+    filler = ["Nothing much happens in this paragraph about the weather today."] * 20
+    context = "\n\n".join(filler[:10] + ["The quarterly revenue forecast rose by twelve percent."] + filler[10:])
+
+    packed = pack_context("summarize the revenue forecast", context, "llama-3.3-70b-versatile", 50)
+
+    assert packed.trimmed and packed.tokens <= 50
+    assert "revenue forecast rose" in packed.text
+    assert GAP_MARKER.strip() in packed.text
@@ -0,0 +1,26 @@
+import json
+import time
+
+from src.metrics import Metrics
+
+
+def test_export_rotates_once_over_max_size(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    metrics = Metrics(export_path=path, max_export_size=2000)
+    for i in range(200):
+        metrics.record("stage", 0.01, i=i)
+        if i % 20 == 0:
+            # Let the writer take the spans in several batches
+            time.sleep(0.01)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        lines = path.read_text().splitlines() if path.exists() else []
+        if lines and json.loads(lines[-1])["i"] == 199:
+            break
+        time.sleep(0.01)
+
+    rotated = tmp_path / "metrics.jsonl.1"
+    assert rotated.exists()
+    assert json.loads(lines[-1])["i"] == 199
+    assert rotated.stat().st_size > 2000
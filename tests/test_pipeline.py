@@ -0,0 +1,49 @@
+import threading
+
+from src.pipeline import Job, PipelineExecutor
+
+
+def test_results_are_delivered_in_submission_order():
+    pipeline = PipelineExecutor(workers=2, max_pending=4)
+    release_first = threading.Event()
+    delivered = []
+    finished = threading.Semaphore(0)
+
+    def first(job):
+        release_first.wait(5)
+        return "first"
+
+    pipeline.submit("first", first, deliver=delivered.append, on_finish=lambda job: finished.release())
+    second = pipeline.submit("second", lambda job: "second", deliver=delivered.append,
+                             on_finish=lambda job: finished.release())
+
+    # The second job finishes first, but waits for the first to be delivered
+    while second.state != Job.DONE:
+        threading.Event().wait(0.01)
+    assert delivered == []
+    release_first.set()
+    for _ in range(2):
+        assert finished.acquire(timeout=5)
+    assert delivered == ["first", "second"]
+
+
+def test_cancelled_job_is_not_delivered_after_finishing():
+    pipeline = PipelineExecutor(workers=2, max_pending=4)
+    release_first = threading.Event()
+    delivered = []
+    finished = []
+    done = threading.Event()
+
+    pipeline.submit("first", lambda job: release_first.wait(5) and "first", deliver=delivered.append)
+    second = pipeline.submit("second", lambda job: "second", deliver=delivered.append,
+                             on_finish=lambda job: (finished.append(job.state), done.set()))
+    while second.state != Job.DONE:
+        threading.Event().wait(0.01)
+
+    # Cancelled after its work finished, while it waited on the first job
+    second.cancel()
+    release_first.set()
+    assert done.wait(5)
+    assert delivered == ["first"]
+    assert finished == [Job.CANCELLED]
+    assert pipeline.pending == 0
@@ -0,0 +1,64 @@
+import threading
+
+from src.router import ProviderRouter
+
+
+def candidates(*keys):
+    return [(key, lambda key=key: key) for key in keys]
+
+
+def test_routes_are_sampled_before_ranking_by_latency():
+    router = ProviderRouter(min_samples=3)
+    router.record("groq/whisper", 1.0, True)
+
+    # One sample of groq must not lock openai out before it has been measured
+    assert [key for key, _ in router.rank(candidates("groq/whisper", "openai/whisper"))][0] == "openai/whisper"
+
+    for _ in range(3):
+        router.record("groq/whisper", 1.0, True)
+        router.record("openai/whisper", 0.5, True)
+    assert [key for key, _ in router.rank(candidates("groq/whisper", "openai/whisper"))][0] == "openai/whisper"
+
+
+def test_unhealthy_routes_rank_last():
+    router = ProviderRouter(min_samples=1)
+    router.record("groq/whisper", 0.1, True)
+    router.record("openai/whisper", 1.0, True)
+    for _ in range(3):
+        router.record("groq/whisper", 0.1, False)
+    assert [key for key, _ in router.rank(candidates("groq/whisper", "openai/whisper"))][0] == "openai/whisper"
+
+
+def test_requested_provider_outranks_faster_routes():
+    router = ProviderRouter(min_samples=1)
+    router.record("groq/whisper", 0.2, True)
+    router.record("local/base.en", 0.8, True)
+    ranked = router.rank(candidates("groq/whisper", "local/base.en"), prefer="local")
+    assert [key for key, _ in ranked] == ["local/base.en", "groq/whisper"]
+
+    for _ in range(3):
+        router.record("local/base.en", 0.8, False)
+    ranked = router.rank(candidates("groq/whisper", "local/base.en"), prefer="local")
+    assert [key for key, _ in ranked] == ["groq/whisper", "local/base.en"]
+
+
+def test_losing_hedged_result_is_closed():
+    router = ProviderRouter(hedge=True, default_hedge_delay=0.01, min_samples=1)
+    router.record("groq/llama", 0.01, True)
+    router.record("openai/gpt", 0.5, True)
+    closed = threading.Event()
+
+    class Stream:
+        def close(self):
+            closed.set()
+
+    release_slow = threading.Event()
+
+    def slow():
+        release_slow.wait(5)
+        return Stream()
+
+    assert router.call([("groq/llama", slow), ("openai/gpt", lambda: "fast")], "Response streaming") == "fast"
+    assert not closed.is_set()
+    release_slow.set()
+    assert closed.wait(5)
@@ -0,0 +1,44 @@
+import json
+import sys
+import threading
+
+from src.settings_manager import SettingsManager
+
+
+def test_concurrent_saves_keep_every_update(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    settings = SettingsManager()
+    providers = [f"provider-{i}" for i in range(16)]
+    start = threading.Barrier(len(providers))
+
+    def save(provider):
+        start.wait()
+        settings.save_api_key(f"key-{provider}", provider)
+    threads = [threading.Thread(target=save, args=(provider,)) for provider in providers]
+    # Switch threads as often as possible, so unguarded read-modify-writes would interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    settings.flush(timeout=5)
+
+    assert set(settings.load_api_keys()) == set(providers)
+    with open(tmp_path / ".whishpy" / "config.json") as f:
+        assert set(json.load(f)["api_keys"]) == set(providers)
+
+
+def test_subscribers_see_the_latest_value(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    settings = SettingsManager()
+    seen = []
+    settings.subscribe("vad_enabled", seen.append)
+
+    settings.save_vad_enabled(False)
+    settings.save_vad_enabled(True)
+
+    assert seen == [False, True]
@@ -0,0 +1,34 @@
+import numpy as np
+
+from benchmarks.fake_audio import synthetic_speech
+from src.streaming_transcriber import StreamingTranscriber
+
+
+class RecordingService:
+    def __init__(self):
+        self.segments = []
+
+    def transcribe_audio(self, audio):
+        self.segments.append(audio.duration)
+        return f"segment {len(self.segments)}"
+
+
+def feed(session, samples):
+    for start in range(0, len(samples), 1024):
+        session.feed(samples[start:start + 1024].tobytes())
+
+
+def test_quiet_speech_is_cut_at_pauses_and_transcribed():
+    speech = synthetic_speech(40, seed=3).astype(np.float32)
+    # A quiet microphone: speech peaks around 600 instead of near full scale
+    quiet = (speech * 600 / np.abs(speech).max()).astype(np.int16)
+    service = RecordingService()
+    session = StreamingTranscriber(service, sample_rate=16000)
+
+    feed(session, quiet)
+    text = session.finish()
+
+    assert len(service.segments) > 1
+    assert all(duration <= 30.5 for duration in service.segments)
+    assert abs(sum(service.segments) - 40) < 0.1
+    assert text.startswith("segment 1 segment 2")
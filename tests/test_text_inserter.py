@@ -0,0 +1,111 @@
+import contextlib
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from src.text_inserter import TextInserter
+
+
+class FakeController:
+    def __init__(self, events):
+        self.events = events
+
+    @contextlib.contextmanager
+    def pressed(self, key):
+        self.events.append(("down", key))
+        yield
+        self.events.append(("up", key))
+
+    def press(self, key):
+        self.events.append(("press", key))
+        if key == "v":
+            self.events.append(("pasted_at", time.monotonic()))
+
+    def release(self, key):
+        self.events.append(("release", key))
+
+    def type(self, text):
+        self.events.append(("type", text))
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    """Stand-ins for pynput.keyboard and pyperclip, recording what the inserter does."""
+    events = []
+    keyboard = types.ModuleType("pynput.keyboard")
+    keyboard.Key = types.SimpleNamespace(cmd="<cmd>")
+    keyboard.Controller = lambda: FakeController(events)
+    clipboard = types.ModuleType("pyperclip")
+    clipboard.contents = "original"
+    clipboard.copied_at = []
+
+    def copy(text):
+        clipboard.copied_at.append(time.monotonic())
+        clipboard.contents = text
+    clipboard.copy = copy
+    clipboard.paste = lambda: clipboard.contents
+    monkeypatch.setitem(sys.modules, "pynput.keyboard", keyboard)
+    monkeypatch.setitem(sys.modules, "pyperclip", clipboard)
+    return events, clipboard
+
+
+def test_insert_text_with_shortcut_pastes_and_restores_clipboard(fakes):
+    events, clipboard = fakes
+    inserter = TextInserter(restore_delay=0.01)
+
+    inserter.insert_text_with_shortcut("hello world")
+
+    assert [event for event in events if event[0] != "pasted_at"] == [
+        ("down", "<cmd>"), ("press", "v"), ("release", "v"), ("up", "<cmd>")]
+    assert inserter.timings[-1][:2] == ("paste", 11)
+    deadline = time.monotonic() + 2
+    while clipboard.contents != "original" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert clipboard.contents == "original"
+
+
+def test_streamed_batches_wait_for_the_previous_paste(fakes):
+    events, clipboard = fakes
+    inserter = TextInserter(restore_delay=0.01, paste_settle=0.05)
+
+    inserter.insert_stream(["One. ", "Two. ", "Three."])
+    time.sleep(0.1)
+
+    pasted = [at for name, at in events if name == "pasted_at"]
+    assert len(pasted) == 3
+    # Every copy after the first paste leaves the target app `paste_settle` to read the clipboard
+    for copied in clipboard.copied_at:
+        earlier = [at for at in pasted if at <= copied]
+        assert not earlier or copied - earlier[-1] >= 0.05
+
+
+def test_empty_selection_gives_up_quickly(fakes):
+    _, clipboard = fakes
+    inserter = TextInserter(selection_timeout=0.15)
+
+    started = time.monotonic()
+    assert inserter.get_selected_text() == "original"
+    assert time.monotonic() - started < 0.3
+    assert clipboard.contents == "original"
+
+
+def test_paste_waits_for_a_selection_read_in_progress(fakes):
+    _, clipboard = fakes
+    inserter = TextInserter(restore_delay=0.01, selection_timeout=1.0)
+    inserter.warm_up()
+    press = inserter.keyboard.press
+    paster = threading.Thread(target=inserter.insert_text_with_shortcut, args=("pasted",))
+
+    def press_and_paste(key):
+        press(key)
+        if key == "c":
+            # The app answers Cmd+C a moment later, while a paste from another thread is under way
+            threading.Timer(0.05, clipboard.copy, args=("selected",)).start()
+            paster.start()
+    inserter.keyboard.press = press_and_paste
+
+    assert inserter.get_selected_text() == "selected"
+    paster.join(2)